@@ -1,4 +1,5 @@
 from flask import Flask, render_template
+from werkzeug.local import LocalProxy
 from .extensions import db, login_manager, mail
 from .models import User
 from .seeds import seed_data_if_needed
@@ -10,6 +11,15 @@ from .blueprints.admin import admin_bp
 from .blueprints.account import account_bp
 from .api.routes import api_bp
 from .email import init_email
+from .jobs import init_jobs
+from .catalog import init_catalog
+from .facets import init_facets
+from .changelog import init_changelog
+from .categories import init_categories, ensure_category_closure
+from .concurrency import ensure_version_columns
+from .ratelimit import init_ratelimit
+from .cli import register_cli
+from .maintenance import init_maintenance
 import os
 
 
@@ -18,10 +28,16 @@ def create_app():
     app.config.from_object("config.Config")
 
     # Initialize extensions
+    init_ratelimit(app)
     db.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
     init_email(app)
+    init_jobs(app)
+    init_catalog(app)
+    init_facets(app)
+    init_changelog(app)
+    init_categories(app)
 
     # Blueprints
     app.register_blueprint(auth_bp)
@@ -32,10 +48,13 @@ def create_app():
     app.register_blueprint(account_bp)
     app.register_blueprint(api_bp, url_prefix="/api")
 
+    register_cli(app)
+
     @app.context_processor
     def inject_globals():
         from .models import Category
-        categories = Category.query.order_by(Category.name).all()
+        # Only queried by templates that actually use it
+        categories = LocalProxy(lambda: Category.query.order_by(Category.name).all())
         return {"all_categories": categories}
 
     @app.route("/")
@@ -48,6 +67,10 @@ def create_app():
             db.create_all()
         else:
             db.create_all()
+        ensure_version_columns()
         seed_data_if_needed()
+        ensure_category_closure()
+
+    init_maintenance(app)
 
     return app
\ No newline at end of file
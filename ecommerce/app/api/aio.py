@@ -0,0 +1,186 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from werkzeug.http import parse_cookie
+from ..models import Product, Order, ProductChange
+from ..categories import filter_by_category_subtree, parse_category_arg
+from ..changelog import parse_change_query
+from ..ratelimit import RateLimiter, create_store
+from .serializers import InvalidFields, encode_body, order_schema, product_change_schema, product_schema
+
+
+def async_database_url(flask_app: Flask) -> str:
+    """Async driver URL for the app database, resolving relative SQLite paths like Flask-SQLAlchemy."""
+    if flask_app.config.get("ASYNC_DATABASE_URL"):
+        return flask_app.config["ASYNC_DATABASE_URL"]
+    url = make_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite":
+        raise ValueError("Set ASYNC_DATABASE_URL to an async driver URL for non-SQLite databases")
+    database = url.database
+    if database and database != ":memory:" and not os.path.isabs(database):
+        database = os.path.join(flask_app.instance_path, database)
+    return url.set(drivername="sqlite+aiosqlite", database=database).render_as_string(hide_password=False)
+
+
+class AsyncReadAPI:
+    """Read-only ASGI version of the JSON API for clients holding many open connections.
+
+    Serves the same payloads as the Flask ``api`` blueprint. The logged-in user
+    is read from the Flask session cookie, so a browser or app session works
+    against both entry points.
+    """
+
+    def __init__(self, flask_app: Flask, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or create_async_engine(async_database_url(flask_app))
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.cookie_name = flask_app.config.get("SESSION_COOKIE_NAME", "session")
+        self.session_max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        self.serializer = SecureCookieSessionInterface().get_signing_serializer(flask_app)
+        self.gzip_min_size = flask_app.config.get("API_GZIP_MIN_SIZE", 1024)
+        self.limiter = None
+        if flask_app.config.get("RATELIMIT_ENABLED", True):
+            self.limiter = RateLimiter(
+                flask_app.config.get("RATELIMITS", {}),
+                create_store(flask_app.config.get("RATELIMIT_STORAGE_URL", "memory://")),
+            )
+        # Endpoint names match the Flask blueprint so rate limit rules apply to both
+        self.routes = {
+            "/api/products": ("api.api_products", self.api_products),
+            "/api/orders/me": ("api.api_my_orders", self.api_my_orders),
+            "/api/changes": ("api.api_product_changes", self.api_product_changes),
+        }
+        self.changes_max_batch = flask_app.config.get("CHANGES_MAX_BATCH", 1000)
+        self.changes_max_wait = flask_app.config.get("CHANGES_MAX_WAIT", 25)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        route = self.routes.get(scope["path"].rstrip("/") or "/")
+        if route is None:
+            await self._send_json(send, 404, {"error": "not found"})
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_json(send, 405, {"error": "method not allowed"}, [(b"allow", b"GET, HEAD")])
+            return
+        endpoint, handler = route
+        user_id = self._session_user_id(scope)
+        if self.limiter is not None:
+            client = scope.get("client") or ("-", 0)
+            check = (endpoint, scope["method"], client[0], user_id)
+            if self.limiter.store.blocking:
+                # A shared SQLite store can wait on its lock; keep that off the event loop
+                wait = await asyncio.to_thread(self.limiter.check, *check)
+            else:
+                wait = self.limiter.check(*check)
+            if wait:
+                retry_after = str(max(1, int(wait + 0.999))).encode()
+                await self._send_json(send, 429, {"error": "rate limit exceeded"}, [(b"retry-after", retry_after)])
+                return
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            status, payload = await handler(user_id, {key: values[0] for key, values in query.items()})
+        except InvalidFields as error:
+            status, payload = 400, {"error": str(error)}
+        accept_encoding = self._header(scope, b"accept-encoding")
+        await self._send_json(send, status, payload, head=scope["method"] == "HEAD", accept_encoding=accept_encoding)
+
+    async def api_products(self, user_id: Optional[str], args: dict):
+        names = product_schema.field_names(args.get("fields"))
+        stmt = product_schema.select(names).where(Product.is_active.is_(True))
+        category_id = parse_category_arg(args.get("category"))
+        if category_id is not None:
+            stmt = filter_by_category_subtree(stmt, category_id)
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(stmt)).all()
+        return 200, product_schema.dump_rows(rows, names)
+
+    async def api_my_orders(self, user_id: Optional[str], args: dict):
+        if user_id is None:
+            return 401, {"error": "authentication required"}
+        names = order_schema.field_names(args.get("fields"))
+        stmt = order_schema.select(names).where(Order.user_id == int(user_id)).order_by(Order.created_at.desc())
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(stmt)).all()
+        return 200, order_schema.dump_rows(rows, names)
+
+    async def api_product_changes(self, user_id: Optional[str], args: dict):
+        # Same contract as the Flask endpoint; waiting here costs no worker thread
+        if user_id is None:
+            return 401, {"error": "authentication required"}
+        try:
+            after, limit, wait = parse_change_query(args, self.changes_max_batch, self.changes_max_wait)
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        names = list(product_change_schema.fields)
+        stmt = product_change_schema.select(names).where(ProductChange.id > after).order_by(ProductChange.id).limit(limit)
+        deadline = time.monotonic() + wait
+        while True:
+            async with self.sessionmaker() as session:
+                rows = (await session.execute(stmt)).all()
+            remaining = deadline - time.monotonic()
+            if rows or remaining <= 0:
+                break
+            await asyncio.sleep(min(1.0, remaining))
+        changes = product_change_schema.dump_rows(rows, names)
+        return 200, {
+            "changes": changes,
+            "last_seq": changes[-1]["seq"] if changes else after,
+            "has_more": len(changes) == limit,
+        }
+
+    def _session_user_id(self, scope) -> Optional[str]:
+        if self.serializer is None:
+            return None
+        cookie_header = self._header(scope, b"cookie")
+        if not cookie_header:
+            return None
+        value = parse_cookie(cookie_header).get(self.cookie_name)
+        if not value:
+            return None
+        try:
+            data = self.serializer.loads(value, max_age=self.session_max_age)
+        except BadSignature:
+            return None
+        return data.get("_user_id")
+
+    @staticmethod
+    def _header(scope, name: bytes) -> str:
+        return "; ".join(v.decode("latin-1") for k, v in scope.get("headers", ()) if k == name)
+
+    async def _send_json(self, send, status: int, payload, headers=(), head: bool = False, accept_encoding: str = ""):
+        body, body_headers = encode_body(payload, accept_encoding, self.gzip_min_size)
+        response_headers = [(k.lower().encode(), v.encode()) for k, v in body_headers]
+        response_headers.append((b"content-length", str(len(body)).encode()))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [*response_headers, *headers],
+        })
+        await send({"type": "http.response.body", "body": b"" if head else body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app() -> AsyncReadAPI:
+    # Only config, secret key and instance path are needed; the full app (and its DB setup) is not created
+    flask_app = Flask("app")
+    flask_app.config.from_object("config.Config")
+    return AsyncReadAPI(flask_app)
@@ -1,36 +1,76 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import login_required, current_user
-from ..models import Product, Order
+from ..extensions import db
+from ..models import Product, Order, ProductChange
+from ..changelog import parse_change_query, wait_for_changes
+from ..categories import filter_by_category_subtree, parse_category_arg
+from .serializers import InvalidFields, encode_body, order_schema, product_change_schema, product_schema
 
 
 api_bp = Blueprint("api", __name__)
 
 
+def _json_response(payload):
+    body, headers = encode_body(
+        payload,
+        request.headers.get("Accept-Encoding", ""),
+        current_app.config.get("API_GZIP_MIN_SIZE", 1024),
+    )
+    response = current_app.response_class(body)
+    for name, value in headers:
+        response.headers[name] = value
+    return response
+
+
+@api_bp.errorhandler(InvalidFields)
+def invalid_fields(error):
+    return jsonify({"error": str(error)}), 400
+
+
 @api_bp.get("/products")
 def api_products():
-    products = Product.query.filter_by(is_active=True).all()
-    return jsonify([
-        {
-            "id": p.id,
-            "title": p.title,
-            "price": float(p.price),
-            "stock": p.stock,
-            "image_url": p.image_url,
-        }
-        for p in products
-    ])
+    names = product_schema.field_names(request.args.get("fields"))
+    stmt = product_schema.select(names).where(Product.is_active.is_(True))
+    category_id = parse_category_arg(request.args.get("category"))
+    if category_id is not None:
+        # Includes products in subcategories
+        stmt = filter_by_category_subtree(stmt, category_id)
+    rows = db.session.execute(stmt).all()
+    return _json_response(product_schema.dump_rows(rows, names))
 
 
 @api_bp.get("/orders/me")
 @login_required
 def api_my_orders():
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
-    return jsonify([
-        {
-            "id": o.id,
-            "status": o.status,
-            "created_at": o.created_at.isoformat(),
-            "total_amount": float(o.total_amount),
-        }
-        for o in orders
-    ])
\ No newline at end of file
+    names = order_schema.field_names(request.args.get("fields"))
+    stmt = order_schema.select(names).where(Order.user_id == current_user.id).order_by(Order.created_at.desc())
+    rows = db.session.execute(stmt).all()
+    return _json_response(order_schema.dump_rows(rows, names))
+
+
+@api_bp.get("/changes")
+@login_required
+def api_product_changes():
+    """Product/inventory changes with a sequence number above ``after``.
+
+    Waits up to ``wait`` seconds (long-poll) when there are none yet. Clients
+    pass the returned ``last_seq`` as ``after`` on their next call. Requires a
+    login: rows include stock and prices of inactive products.
+    """
+    try:
+        after, limit, wait = parse_change_query(
+            request.args,
+            current_app.config.get("CHANGES_MAX_BATCH", 1000),
+            current_app.config.get("CHANGES_MAX_WAIT", 25),
+        )
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    names = list(product_change_schema.fields)
+    stmt = product_change_schema.select(names).where(ProductChange.id > after).order_by(ProductChange.id).limit(limit)
+    rows = wait_for_changes(lambda: db.session.execute(stmt).all(), wait)
+    changes = product_change_schema.dump_rows(rows, names)
+    return _json_response({
+        "changes": changes,
+        "last_seq": changes[-1]["seq"] if changes else after,
+        "has_more": len(changes) == limit,
+    })
\ No newline at end of file
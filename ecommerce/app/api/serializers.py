@@ -0,0 +1,129 @@
+import gzip
+import json
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from ..models import Product, Order, ProductChange
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _isoformat(value) -> str:
+    return value.isoformat()
+
+
+def _split_fields(value) -> List[str]:
+    return value.split(",")
+
+
+class Field:
+    def __init__(self, column, encode: Optional[Callable] = None):
+        self.column = column
+        self.encode = encode
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Schema:
+    """Declarative list of JSON fields for a model, each backed by a single column.
+
+    Queries built from a schema select only the requested columns, so rows are
+    plain tuples rather than hydrated ORM entities.
+    """
+
+    def __init__(self, model, **fields: Field):
+        self.model = model
+        self.fields: Dict[str, Field] = fields
+
+    def field_names(self, spec: Optional[str] = None) -> List[str]:
+        """Resolve a sparse fieldset such as ``"id,price"`` (all fields when empty)."""
+        if not spec:
+            return list(self.fields)
+        names = [name.strip() for name in spec.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise InvalidFields(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(self.fields)}")
+        return names
+
+    def select(self, names: Sequence[str]):
+        return select(*(self.fields[name].column for name in names))
+
+    def dump_rows(self, rows, names: Sequence[str]) -> List[dict]:
+        encoders = [self.fields[name].encode for name in names]
+        return [
+            {
+                name: (encode(value) if encode is not None and value is not None else value)
+                for name, encode, value in zip(names, encoders, row)
+            }
+            for row in rows
+        ]
+
+
+product_schema = Schema(
+    Product,
+    id=Field(Product.id),
+    title=Field(Product.title),
+    price=Field(Product.price, float),
+    stock=Field(Product.stock),
+    image_url=Field(Product.image_url),
+)
+
+order_schema = Schema(
+    Order,
+    id=Field(Order.id),
+    status=Field(Order.status),
+    created_at=Field(Order.created_at, _isoformat),
+    total_amount=Field(Order.total_amount, float),
+)
+
+product_change_schema = Schema(
+    ProductChange,
+    seq=Field(ProductChange.id),
+    product_id=Field(ProductChange.product_id),
+    vendor_id=Field(ProductChange.vendor_id),
+    op=Field(ProductChange.op),
+    fields=Field(ProductChange.fields, _split_fields),
+    stock=Field(ProductChange.stock),
+    stock_delta=Field(ProductChange.stock_delta),
+    price=Field(ProductChange.price, float),
+    is_active=Field(ProductChange.is_active),
+    created_at=Field(ProductChange.created_at, _isoformat),
+)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """True when an Accept-Encoding header allows gzip (an explicit ``gzip;q=0`` refuses it)."""
+    qualities = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0))) > 0
+
+
+def encode_body(payload, accept_encoding: str = "", gzip_min_size: int = 1024) -> Tuple[bytes, List[Tuple[str, str]]]:
+    """Encode ``payload`` as JSON, gzipped when the client accepts it and the body is large enough."""
+    body = dumps(payload)
+    headers = [("Content-Type", "application/json"), ("Vary", "Accept-Encoding")]
+    if gzip_min_size >= 0 and len(body) >= gzip_min_size and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=5)
+        headers.append(("Content-Encoding", "gzip"))
+    return body, headers
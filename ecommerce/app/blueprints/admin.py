@@ -1,10 +1,15 @@
-from datetime import datetime
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, stream_with_context, send_from_directory, abort, current_app
 from flask_login import login_required, current_user
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from ..extensions import db
-from ..models import User, Vendor, Product, Order, OrderItem, ROLE_ADMIN, ORDER_STATUSES
-from ..forms import VendorApprovalForm, OrderStatusForm
+from ..models import User, Vendor, Product, Order, ROLE_ADMIN, ORDER_STATUSES
+from ..forms import VendorApprovalForm, OrderStatusForm, OrderExportForm
+from ..email import queue_email
+from ..exports import export_dir, export_job_rows, iter_csv, iter_order_rows, list_export_files, parse_date_range, start_export_job
+from ..jobs import queue_stats, recent_jobs
+from ..reports import report_snapshot
 from ..utils import role_required
 
 
@@ -60,20 +65,53 @@ def products():
 
 @admin_bp.route("/orders", methods=["GET", "POST"]) 
 def orders():
-    orders = Order.query.order_by(Order.created_at.desc()).all()
+    orders = Order.query.options(joinedload(Order.user)).order_by(Order.created_at.desc()).all()
     return render_template("admin/orders.html", orders=orders)
 
 
+@admin_bp.route("/orders/export.csv")
+def export_orders_csv():
+    # Streamed straight from the cursor; pass from_id to resume an interrupted download
+    try:
+        start_at, end_at = parse_date_range(request.args.get("start", ""), request.args.get("end", ""))
+    except ValueError:
+        abort(400)
+    from_id = request.args.get("from_id", type=int, default=0)
+    rows = iter_order_rows(start_at, end_at, from_id)
+    filename = f"orders_{request.args['start']}_{request.args['end']}_from{from_id}.csv"
+    return Response(
+        stream_with_context(iter_csv(rows)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@admin_bp.route("/exports", methods=["GET", "POST"])
+def exports():
+    form = OrderExportForm()
+    if form.validate_on_submit():
+        start_export_job(form.start.data.isoformat(), form.end.data.isoformat(), form.format.data, form.from_id.data or 0)
+        db.session.commit()
+        flash("Export queued.", "success")
+        return redirect(url_for("admin.exports"))
+    return render_template("admin/exports.html", form=form, jobs=export_job_rows(), files=list_export_files())
+
+
+@admin_bp.route("/exports/<path:filename>")
+def export_download(filename: str):
+    # send_from_directory honours Range requests, so large files can resume
+    return send_from_directory(export_dir(), filename, as_attachment=True)
+
+
 @admin_bp.route("/orders/<int:order_id>", methods=["GET", "POST"]) 
 def order_detail(order_id: int):
     order = Order.query.get_or_404(order_id)
     form = OrderStatusForm(status=order.status)
     if form.validate_on_submit():
         order.status = form.status.data
-        db.session.commit()
         # Email notification to customer
-        from ..email import send_email
-        send_email(to=order.user.email, subject=f"Order #{order.id} status updated", body=f"Your order status is now: {order.status}")
+        queue_email(to=order.user.email, subject=f"Order #{order.id} status updated", body=f"Your order status is now: {order.status}")
+        db.session.commit()
         flash("Order status updated.", "success")
         return redirect(url_for("admin.order_detail", order_id=order.id))
     return render_template("admin/order_detail.html", order=order, form=form)
@@ -81,25 +119,11 @@ def order_detail(order_id: int):
 
 @admin_bp.route("/reports")
 def reports():
-    # Total sales
-    total_sales = db.session.query(func.coalesce(func.sum(Order.total_amount), 0)).scalar() or 0
-
-    # Sales per vendor
-    sales_per_vendor = db.session.query(
-        Vendor.name,
-        func.coalesce(func.sum(OrderItem.unit_price * OrderItem.quantity), 0)
-    ).join(Product, Product.vendor_id == Vendor.id).join(OrderItem, OrderItem.product_id == Product.id).group_by(Vendor.id).all()
-
-    # Best-selling products
-    best_selling = db.session.query(
-        Product.title,
-        func.sum(OrderItem.quantity).label("qty")
-    ).join(OrderItem, OrderItem.product_id == Product.id).group_by(Product.id).order_by(func.sum(OrderItem.quantity).desc()).limit(10).all()
-
-    # Monthly revenue (last 12 months)
-    monthly = db.session.query(
-        func.strftime('%Y-%m', Order.created_at).label('month'),
-        func.coalesce(func.sum(Order.total_amount), 0)
-    ).group_by('month').order_by('month').all()
-
-    return render_template("admin/reports.html", total_sales=total_sales, sales_per_vendor=sales_per_vendor, best_selling=best_selling, monthly=monthly)
\ No newline at end of file
+    # Aggregated by a job worker and refreshed every REPORTS_MAX_AGE_SECONDS
+    report, generated_at = report_snapshot(timedelta(seconds=current_app.config.get("REPORTS_MAX_AGE_SECONDS", 300)))
+    return render_template("admin/reports.html", generated_at=generated_at, **report)
+
+
+@admin_bp.route("/jobs")
+def jobs():
+    return render_template("admin/jobs.html", stats=queue_stats(), jobs=recent_jobs(limit=50))
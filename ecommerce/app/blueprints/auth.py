@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from ..extensions import db
 from ..forms import RegistrationForm, LoginForm
 from ..models import User, Vendor, ROLE_VENDOR, ROLE_CUSTOMER
+from ..ratelimit import record_failed_attempt
 
 
 auth_bp = Blueprint("auth", __name__, template_folder="../templates/auth")
@@ -48,6 +49,9 @@ def login():
             flash("Logged in successfully.", "success")
             next_url = request.args.get("next")
             return redirect(next_url or url_for("shop.product_list"))
+        throttled = record_failed_attempt("auth.login", form.email.data)
+        if throttled is not None:
+            return throttled
         flash("Invalid credentials.", "danger")
     return render_template("auth/login.html", form=form)
 
@@ -1,23 +1,31 @@
+from datetime import datetime
 from decimal import Decimal
-from flask import Blueprint, render_template, redirect, url_for, request, flash, session
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session, abort
 from flask_login import current_user, login_required
+from sqlalchemy.orm.exc import StaleDataError
 from ..extensions import db
 from ..models import Product, CartItem, Order, OrderItem, ORDER_STATUS_PENDING
 from ..forms import CheckoutForm
 from ..utils import get_or_create_session_id
-from ..email import send_email
+from ..email import queue_email
+from ..concurrency import VersionConflict, delete_cart_item, update_cart_item
 
 
 cart_bp = Blueprint("cart", __name__, url_prefix="/cart", template_folder="../templates/cart")
 
+# Read-modify-write attempts when a version-checked flush finds the row changed
+STALE_RETRIES = 3
 
-def _get_cart_items():
+
+def _cart_owner():
+    # Criterion matching the current visitor's cart rows
     if current_user.is_authenticated:
-        items = CartItem.query.filter_by(user_id=current_user.id).all()
-    else:
-        sid = get_or_create_session_id()
-        items = CartItem.query.filter_by(session_id=sid).all()
-    return items
+        return CartItem.user_id == current_user.id
+    return CartItem.session_id == get_or_create_session_id()
+
+
+def _get_cart_items():
+    return CartItem.query.filter(_cart_owner()).all()
 
 
 def _cart_totals(items):
@@ -42,44 +50,68 @@ def add_to_cart(product_id: int):
         quantity = 1
 
     if current_user.is_authenticated:
-        item = CartItem.query.filter_by(user_id=current_user.id, product_id=product.id).first()
-        if not item:
-            item = CartItem(user_id=current_user.id, product_id=product.id, quantity=0)
-            db.session.add(item)
+        owner = {"user_id": current_user.id}
     else:
-        sid = get_or_create_session_id()
-        item = CartItem.query.filter_by(session_id=sid, product_id=product.id).first()
+        owner = {"session_id": get_or_create_session_id()}
+    for _ in range(STALE_RETRIES):
+        item = CartItem.query.filter_by(product_id=product.id, **owner).first()
         if not item:
-            item = CartItem(session_id=sid, product_id=product.id, quantity=0)
+            item = CartItem(product_id=product.id, quantity=0, **owner)
             db.session.add(item)
-    item.quantity += quantity
-    db.session.commit()
+        item.quantity += quantity
+        # Keeps an active guest cart clear of the stale-cart GC
+        item.added_at = datetime.utcnow()
+        try:
+            db.session.commit()
+            break
+        except StaleDataError:
+            # Another request changed or removed the item; re-read it and add again
+            db.session.rollback()
+    else:
+        return _cart_conflict()
     flash("Item added to cart.", "success")
     return redirect(request.referrer or url_for("shop.product_detail", product_id=product.id))
 
 
 @cart_bp.route("/update/<int:item_id>", methods=["POST"]) 
 def update_item(item_id: int):
-    item = CartItem.query.get_or_404(item_id)
     quantity = int(request.form.get("quantity", 1))
-    if quantity <= 0:
-        db.session.delete(item)
-    else:
-        item.quantity = quantity
-    db.session.commit()
+    version = request.form.get("version", type=int)
+    if version is None:
+        abort(400)
+    try:
+        if quantity <= 0:
+            found = delete_cart_item(item_id, _cart_owner(), version)
+        else:
+            found = update_cart_item(item_id, _cart_owner(), version, quantity)
+    except VersionConflict:
+        return _cart_conflict()
+    if found is None:
+        abort(404)
     flash("Cart updated.", "info")
     return redirect(url_for("cart.view_cart"))
 
 
 @cart_bp.route("/remove/<int:item_id>")
 def remove_item(item_id: int):
-    item = CartItem.query.get_or_404(item_id)
-    db.session.delete(item)
-    db.session.commit()
+    version = request.args.get("version", type=int)
+    if version is None:
+        abort(400)
+    try:
+        found = delete_cart_item(item_id, _cart_owner(), version)
+    except VersionConflict:
+        return _cart_conflict()
+    if found is None:
+        abort(404)
     flash("Item removed.", "info")
     return redirect(url_for("cart.view_cart"))
 
 
+def _cart_conflict():
+    flash("Your cart was changed in another window. Please review it and try again.", "warning")
+    return view_cart(), 409
+
+
 @cart_bp.route("/checkout", methods=["GET", "POST"]) 
 @login_required
 def checkout():
@@ -102,22 +134,28 @@ def checkout():
         db.session.add(order)
         db.session.flush()
 
-        # Create order items and adjust stock
-        for ci in items:
-            if ci.quantity > ci.product.stock:
-                flash(f"Insufficient stock for {ci.product.title}", "danger")
-                db.session.rollback()
-                return redirect(url_for("cart.view_cart"))
-            oi = OrderItem(order_id=order.id, product_id=ci.product.id, quantity=ci.quantity, unit_price=ci.product.price)
-            ci.product.stock -= ci.quantity
-            db.session.add(oi)
-            db.session.delete(ci)
-
-        order.compute_total()
-        db.session.commit()
-
-        # Send confirmation email
-        send_email(to=current_user.email, subject="Order Confirmation", body=f"Thank you for your order #{order.id}. Total: ${order.total_amount}")
+        # Stock and cart rows are version-checked when flushed (also by autoflush)
+        try:
+            # Create order items and adjust stock
+            for ci in items:
+                if ci.quantity > ci.product.stock:
+                    flash(f"Insufficient stock for {ci.product.title}", "danger")
+                    db.session.rollback()
+                    return redirect(url_for("cart.view_cart"))
+                oi = OrderItem(order_id=order.id, product_id=ci.product.id, quantity=ci.quantity, unit_price=ci.product.price)
+                ci.product.stock -= ci.quantity
+                db.session.add(oi)
+                db.session.delete(ci)
+
+            order.compute_total()
+            # Confirmation email is queued in the same transaction as the order
+            queue_email(to=current_user.email, subject="Order Confirmation", body=f"Thank you for your order #{order.id}. Total: ${order.total_amount}")
+            db.session.commit()
+        except StaleDataError:
+            # A product's stock or price, or the cart itself, changed since it was read
+            db.session.rollback()
+            flash("Some items in your cart changed while you were checking out. Please review your cart and try again.", "warning")
+            return redirect(url_for("cart.view_cart"))
 
         return render_template("cart/order_confirmation.html", order=order)
 
@@ -135,13 +173,18 @@ def merge_session_cart_after_login():
     session_items = CartItem.query.filter_by(session_id=sid).all()
     if not session_items:
         return
-    for si in session_items:
-        existing = CartItem.query.filter_by(user_id=current_user.id, product_id=si.product_id).first()
-        if existing:
-            existing.quantity += si.quantity
-            db.session.delete(si)
-        else:
-            si.user_id = current_user.id
-            si.session_id = None
-    db.session.commit()
+    try:
+        for si in session_items:
+            existing = CartItem.query.filter_by(user_id=current_user.id, product_id=si.product_id).first()
+            if existing:
+                existing.quantity += si.quantity
+                db.session.delete(si)
+            else:
+                si.user_id = current_user.id
+                si.session_id = None
+        db.session.commit()
+    except StaleDataError:
+        # A concurrent request changed one of the carts; keep the sid and merge on the next request
+        db.session.rollback()
+        return
     session.pop("sid", None)
\ No newline at end of file
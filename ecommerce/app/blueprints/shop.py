@@ -1,42 +1,83 @@
-from flask import Blueprint, render_template, request
-from sqlalchemy import or_, and_
+import math
+from typing import Optional
+from flask import Blueprint, render_template, request, abort, url_for
+from sqlalchemy import or_, select
 from ..extensions import db
-from ..models import Product, Category
+from ..models import Product
+from ..catalog import get_product_detail
+from ..categories import category_breadcrumbs
+from ..facets import facet_index, PRICE_BUCKETS
 
 
 shop_bp = Blueprint("shop", __name__, url_prefix="/shop", template_folder="../templates/shop")
 
 
+def _refine_url(**changes) -> str:
+    # Current filters with some facets set (or cleared with None)
+    args = request.args.to_dict()
+    for key, value in changes.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
+    return url_for("shop.product_list", **args)
+
+
+def _price_arg(name: str) -> Optional[float]:
+    # inf/nan (e.g. ?min_price=1e400) mean no bound; the facet index works in whole cents
+    value = request.args.get(name, type=float)
+    return value if value is not None and math.isfinite(value) else None
+
+
 @shop_bp.route("/")
 @shop_bp.route("/products")
 def product_list():
-    query = Product.query.filter_by(is_active=True)
-
     keyword = request.args.get("q", type=str, default="").strip()
     category_id = request.args.get("category", type=int)
-    min_price = request.args.get("min_price", type=float)
-    max_price = request.args.get("max_price", type=float)
+    vendor_id = request.args.get("vendor", type=int)
+    price_bucket = request.args.get("price", type=str)
+    min_price = _price_arg("min_price")
+    max_price = _price_arg("max_price")
 
+    keyword_ids = None
     if keyword:
         like = f"%{keyword}%"
-        query = query.filter(or_(Product.title.ilike(like), Product.description.ilike(like)))
-
-    if category_id:
-        query = query.filter(Product.category_id == category_id)
+        keyword_ids = db.session.execute(
+            select(Product.id).where(Product.is_active.is_(True), or_(Product.title.ilike(like), Product.description.ilike(like)))
+        ).scalars().all()
 
-    if min_price is not None and max_price is not None:
-        query = query.filter(and_(Product.price >= min_price, Product.price <= max_price))
-    elif min_price is not None:
-        query = query.filter(Product.price >= min_price)
-    elif max_price is not None:
-        query = query.filter(Product.price <= max_price)
+    facets = facet_index.search(
+        category_id=category_id,
+        vendor_id=vendor_id,
+        price_bucket=price_bucket,
+        min_price=min_price,
+        max_price=max_price,
+        keyword_ids=keyword_ids,
+    )
 
-    products = query.order_by(Product.created_at.desc()).all()
-    categories = Category.query.order_by(Category.name).all()
-    return render_template("shop/product_list.html", products=products, categories=categories)
+    products = []
+    if facets.product_ids:
+        products = (
+            Product.query.filter(Product.id.in_(facets.product_ids), Product.is_active.is_(True))
+            .order_by(Product.created_at.desc())
+            .all()
+        )
+    return render_template(
+        "shop/product_list.html",
+        products=products,
+        facets=facets,
+        category_tree=facet_index.category_tree(),
+        vendor_names=facet_index.vendor_names(),
+        price_buckets=[key for key, _, _ in PRICE_BUCKETS],
+        breadcrumbs=category_breadcrumbs(category_id) if category_id else [],
+        selected={"category": category_id, "vendor": vendor_id, "price": price_bucket},
+        refine_url=_refine_url,
+    )
 
 
 @shop_bp.route("/product/<int:product_id>")
 def product_detail(product_id: int):
-    product = Product.query.get_or_404(product_id)
-    return render_template("shop/product_detail.html", product=product)
\ No newline at end of file
+    product = get_product_detail(product_id)
+    if product is None:
+        abort(404)
+    return render_template("shop/product_detail.html", product=product)
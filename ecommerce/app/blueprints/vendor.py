@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from ..extensions import db
 from ..models import Vendor, Product, OrderItem
 from ..forms import ProductForm
+from ..concurrency import VersionConflict, update_product
 from ..utils import role_required
 
 
@@ -84,22 +85,37 @@ def product_new():
 @role_required("vendor")
 def product_edit(product_id: int):
     _require_vendor()
-    product = Product.query.filter_by(id=product_id, vendor_id=current_user.vendor.id).first_or_404()
-    form = ProductForm(obj=product)
+    vendor_id = current_user.vendor.id
+    form = ProductForm()
+    if not form.is_submitted():
+        form.process(obj=Product.query.filter_by(id=product_id, vendor_id=vendor_id).first_or_404())
     from ..models import Category
     form.category_id.choices = [(0, "-- None --")] + [(c.id, c.name) for c in Category.query.order_by(Category.name).all()]
 
     if form.validate_on_submit():
-        product.title = form.title.data
-        product.description = form.description.data
-        product.price = form.price.data
-        product.stock = form.stock.data
-        product.image_url = form.image_url.data or None
+        if form.version.data is None:
+            abort(400)
         category_id = form.category_id.data or None
         if category_id == 0:
             category_id = None
-        product.category_id = category_id
-        db.session.commit()
+        # One UPDATE scoped by vendor and the version the form was rendered from
+        try:
+            version = update_product(product_id, vendor_id, form.version.data, {
+                "title": form.title.data,
+                "description": form.description.data,
+                "price": form.price.data,
+                "stock": form.stock.data,
+                "image_url": form.image_url.data or None,
+                "category_id": category_id,
+            })
+        except VersionConflict as conflict:
+            # Render the current version (not the one submitted) so saving again overwrites theirs
+            form.version.raw_data = None
+            form.version.data = conflict.current_version
+            flash("This product was changed by someone else while you were editing. Your changes were not saved; save again to overwrite theirs.", "warning")
+            return render_template("vendor/product_form.html", form=form, action="Edit"), 409
+        if version is None:
+            abort(404)
         flash("Product updated.", "success")
         return redirect(url_for("vendor.products"))
 
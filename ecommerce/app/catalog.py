@@ -0,0 +1,321 @@
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from threading import Lock, RLock
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import event, func, inspect, literal, select, union_all
+from sqlalchemy.orm import Session, aliased
+from .extensions import db
+from .models import Product, ProductChange, Vendor, Category, CategoryClosure
+
+
+RELATED_LIMIT = 4
+
+
+class RelatedProduct(NamedTuple):
+    id: int
+    title: str
+    price: Decimal
+    image_url: Optional[str]
+
+
+class ProductDetail(NamedTuple):
+    id: int
+    vendor_id: int
+    category_id: Optional[int]
+    title: str
+    description: Optional[str]
+    price: Decimal
+    stock: int
+    image_url: Optional[str]
+    is_active: bool
+    vendor_name: str
+    category_name: Optional[str]
+    more_from_vendor: Tuple[RelatedProduct, ...]
+    same_category: Tuple[RelatedProduct, ...]
+    breadcrumbs: Tuple[Tuple[int, str], ...]
+
+
+class CatalogChanges(NamedTuple):
+    product_ids: Set[int]
+    vendor_ids: Set[int]
+    category_ids: Set[int]
+    # Categories whose own row changed (name or parent), as opposed to products moving between them
+    category_writes: Set[int]
+
+
+# Callbacks run after a commit that touched products, vendors or categories
+_change_listeners: List[Callable[[CatalogChanges], None]] = []
+
+
+def on_catalog_change(func: Callable[[CatalogChanges], None]) -> Callable[[CatalogChanges], None]:
+    if func not in _change_listeners:
+        _change_listeners.append(func)
+    return func
+
+
+def _collect_changes(session, flush_context) -> None:
+    pending = session.info.setdefault("catalog_changes", CatalogChanges(set(), set(), set(), set()))
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            state = inspect(obj)
+            pending.product_ids.add(obj.id)
+            # Old values matter too: a product moving away still changes the lists it left
+            for attr, bucket in (("vendor_id", pending.vendor_ids), ("category_id", pending.category_ids)):
+                history = state.attrs[attr].history
+                for value in list(history.added) + list(history.unchanged) + list(history.deleted):
+                    if value is not None:
+                        bucket.add(value)
+        elif isinstance(obj, Vendor) and obj.id is not None:
+            pending.vendor_ids.add(obj.id)
+        elif isinstance(obj, Category) and obj.id is not None:
+            pending.category_ids.add(obj.id)
+            pending.category_writes.add(obj.id)
+
+
+def _publish_changes(session) -> None:
+    changes = session.info.pop("catalog_changes", None)
+    if not changes:
+        return
+    for listener in _change_listeners:
+        listener(changes)
+
+
+def _discard_changes(session) -> None:
+    session.info.pop("catalog_changes", None)
+
+
+def publish_catalog_change(product_ids=(), vendor_ids=(), category_ids=(), category_writes=()) -> None:
+    """Notify listeners of writes made outside the ORM unit of work (bulk UPDATE/DELETE)."""
+    changes = CatalogChanges(set(product_ids), set(vendor_ids), set(category_ids), set(category_writes))
+    for listener in _change_listeners:
+        listener(changes)
+
+
+class ChangeFeedFollower:
+    """Replays product writes committed by other processes to the catalog listeners.
+
+    Listeners hear about this process's commits directly; writes from other web
+    workers, job workers or CLI commands are only visible through the
+    ``product_change`` feed, which is read past the last sequence seen at most
+    once every ``min_interval`` seconds.
+    """
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self.last_seq: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = Lock()
+
+    def poll(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.min_interval:
+                return
+            self._checked_at = now
+            if self.last_seq is None:
+                # Nothing is cached yet, so only the starting point matters
+                self.last_seq = db.session.execute(select(func.max(ProductChange.id))).scalar() or 0
+                return
+            rows = db.session.execute(
+                select(ProductChange.id, ProductChange.product_id, ProductChange.vendor_id)
+                .where(ProductChange.id > self.last_seq)
+                .order_by(ProductChange.id)
+            ).all()
+            if not rows:
+                return
+            self.last_seq = rows[-1].id
+        product_ids = {row.product_id for row in rows}
+        vendor_ids = {row.vendor_id for row in rows if row.vendor_id is not None}
+        category_ids = set()
+        # The feed has no category; current placement tells which category lists gained the product
+        for _, vendor_id, category_id in db.session.execute(
+            select(Product.id, Product.vendor_id, Product.category_id).where(Product.id.in_(product_ids))
+        ):
+            vendor_ids.add(vendor_id)
+            if category_id is not None:
+                category_ids.add(category_id)
+        publish_catalog_change(product_ids, vendor_ids, category_ids)
+
+
+catalog_feed = ChangeFeedFollower()
+
+
+class ProductDetailCache:
+    """In-process cache of product detail view models, including related product lists.
+
+    Entries are indexed by vendor, category and the related products they show,
+    so that a write only evicts the pages whose related lists could have
+    changed; they are rebuilt with a single query on the next view. Entries
+    older than ``ttl`` seconds are reloaded too, which bounds staleness from
+    writes the product change feed does not cover (vendor and category renames
+    made by other processes).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, ProductDetail]" = OrderedDict()
+        self._loaded_at: Dict[int, float] = {}
+        self._by_vendor: Dict[int, Set[int]] = {}
+        self._by_category: Dict[int, Set[int]] = {}
+        self._by_related: Dict[int, Set[int]] = {}
+        self._lock = RLock()
+
+    def get(self, product_id: int) -> Optional[ProductDetail]:
+        with self._lock:
+            detail = self._entries.get(product_id)
+            if detail is None:
+                return None
+            if time.monotonic() - self._loaded_at[product_id] > self.ttl:
+                self._drop(product_id)
+                return None
+            self._entries.move_to_end(product_id)
+            return detail
+
+    def put(self, detail: ProductDetail) -> None:
+        with self._lock:
+            self._drop(detail.id)
+            self._entries[detail.id] = detail
+            self._loaded_at[detail.id] = time.monotonic()
+            self._by_vendor.setdefault(detail.vendor_id, set()).add(detail.id)
+            if detail.category_id is not None:
+                self._by_category.setdefault(detail.category_id, set()).add(detail.id)
+            for related in detail.more_from_vendor + detail.same_category:
+                self._by_related.setdefault(related.id, set()).add(detail.id)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def invalidate(self, changes: CatalogChanges) -> None:
+        with self._lock:
+            if changes.category_writes:
+                # Renames and moves can change the breadcrumbs of any product below them
+                self.clear()
+                return
+            stale = set(changes.product_ids)
+            # Pages listing a changed product, even when its old vendor or category is unknown
+            for product_id in changes.product_ids:
+                stale |= self._by_related.get(product_id, set())
+            for vendor_id in changes.vendor_ids:
+                stale |= self._by_vendor.get(vendor_id, set())
+            for category_id in changes.category_ids:
+                stale |= self._by_category.get(category_id, set())
+            for product_id in stale:
+                self._drop(product_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loaded_at.clear()
+            self._by_vendor.clear()
+            self._by_category.clear()
+            self._by_related.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, product_id: int) -> None:
+        detail = self._entries.pop(product_id, None)
+        if detail is None:
+            return
+        del self._loaded_at[product_id]
+        self._by_vendor.get(detail.vendor_id, set()).discard(product_id)
+        if detail.category_id is not None:
+            self._by_category.get(detail.category_id, set()).discard(product_id)
+        for related in detail.more_from_vendor + detail.same_category:
+            self._by_related.get(related.id, set()).discard(product_id)
+
+
+product_cache = ProductDetailCache()
+
+
+def load_product_detail(product_id: int) -> Optional[ProductDetail]:
+    """Build a product's detail view model, related lists and breadcrumbs in one database round trip."""
+    target = aliased(Product)
+    target_vendor = select(target.vendor_id).where(target.id == product_id).scalar_subquery()
+    target_category = select(target.category_id).where(target.id == product_id).scalar_subquery()
+
+    def rows(kind: str, where, limit: Optional[int] = None):
+        stmt = (
+            select(
+                literal(kind).label("kind"),
+                Product.id, Product.vendor_id, Product.category_id, Product.title,
+                Product.description if kind == "self" else literal(None).label("description"),
+                Product.price, Product.stock, Product.image_url, Product.is_active,
+                Vendor.name.label("vendor_name"), Category.name.label("category_name"),
+                literal(None).label("depth"),
+            )
+            .join(Vendor, Vendor.id == Product.vendor_id)
+            .outerjoin(Category, Category.id == Product.category_id)
+            .where(where)
+        )
+        if limit is not None:
+            related = Product.is_active.is_(True) & (Product.id != product_id)
+            stmt = stmt.where(related).order_by(Product.created_at.desc(), Product.id.desc()).limit(limit)
+        return select(stmt.subquery())
+
+    # Breadcrumb rows fill only the category columns and their closure depth
+    crumbs = (
+        select(
+            literal("crumb").label("kind"), literal(None).label("id"), literal(None).label("vendor_id"),
+            Category.id.label("category_id"), literal(None).label("title"), literal(None).label("description"),
+            literal(None).label("price"), literal(None).label("stock"), literal(None).label("image_url"),
+            literal(None).label("is_active"), literal(None).label("vendor_name"), Category.name.label("category_name"),
+            CategoryClosure.depth.label("depth"),
+        )
+        .join(CategoryClosure, CategoryClosure.ancestor_id == Category.id)
+        .where(CategoryClosure.descendant_id == target_category)
+    )
+
+    stmt = union_all(
+        rows("self", Product.id == product_id),
+        rows("vendor", Product.vendor_id == target_vendor, RELATED_LIMIT),
+        rows("category", Product.category_id == target_category, RELATED_LIMIT),
+        crumbs,
+    )
+    result = db.session.execute(stmt).all()
+
+    main = next((r for r in result if r.kind == "self"), None)
+    if main is None:
+        return None
+    more_from_vendor = tuple(RelatedProduct(r.id, r.title, r.price, r.image_url) for r in result if r.kind == "vendor")
+    same_category = tuple(RelatedProduct(r.id, r.title, r.price, r.image_url) for r in result if r.kind == "category")
+    breadcrumbs = tuple((r.category_id, r.category_name) for r in sorted((r for r in result if r.kind == "crumb"), key=lambda r: -r.depth))
+    return ProductDetail(
+        id=main.id,
+        vendor_id=main.vendor_id,
+        category_id=main.category_id,
+        title=main.title,
+        description=main.description,
+        price=main.price,
+        stock=main.stock,
+        image_url=main.image_url,
+        is_active=bool(main.is_active),
+        vendor_name=main.vendor_name,
+        category_name=main.category_name,
+        more_from_vendor=more_from_vendor,
+        same_category=same_category,
+        breadcrumbs=breadcrumbs,
+    )
+
+
+def get_product_detail(product_id: int) -> Optional[ProductDetail]:
+    catalog_feed.poll()
+    detail = product_cache.get(product_id)
+    if detail is None:
+        detail = load_product_detail(product_id)
+        if detail is not None:
+            product_cache.put(detail)
+    return detail
+
+
+def init_catalog(app) -> None:
+    product_cache.max_entries = app.config.get("PRODUCT_CACHE_SIZE", 1024)
+    product_cache.ttl = app.config.get("CATALOG_CACHE_TTL", 300)
+    catalog_feed.min_interval = app.config.get("CATALOG_SYNC_INTERVAL", 1.0)
+    if not event.contains(Session, "after_flush", _collect_changes):
+        event.listen(Session, "after_flush", _collect_changes)
+        event.listen(Session, "after_commit", _publish_changes)
+        event.listen(Session, "after_rollback", _discard_changes)
+    on_catalog_change(product_cache.invalidate)
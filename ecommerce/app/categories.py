@@ -0,0 +1,118 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, event, func, insert, inspect, select, true
+from .extensions import db
+from .models import Category, CategoryClosure, Product
+
+
+closure = CategoryClosure.__table__
+
+
+def _link_new_category(connection, category_id: int, parent_id: Optional[int]) -> None:
+    connection.execute(insert(closure).values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+    if parent_id is not None:
+        connection.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(closure.c.ancestor_id, category_id, closure.c.depth + 1).where(closure.c.descendant_id == parent_id),
+        ))
+
+
+def _move_subtree(connection, category_id: int, new_parent_id: Optional[int]) -> None:
+    subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == category_id)
+    if new_parent_id is not None and connection.execute(
+        select(closure.c.depth).where(closure.c.ancestor_id == category_id, closure.c.descendant_id == new_parent_id)
+    ).first():
+        raise ValueError("A category cannot be moved under itself or one of its descendants")
+    # Drop the links from the old ancestors into the subtree, keep links inside it
+    connection.execute(delete(closure).where(
+        closure.c.descendant_id.in_(subtree),
+        closure.c.ancestor_id.not_in(subtree),
+    ))
+    if new_parent_id is not None:
+        above = closure.alias("above")
+        below = closure.alias("below")
+        connection.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+            .select_from(above)
+            .join(below, true())
+            .where(above.c.descendant_id == new_parent_id, below.c.ancestor_id == category_id),
+        ))
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _link_new_category(connection, target.id, target.parent_id)
+
+
+def _after_update(mapper, connection, target) -> None:
+    if inspect(target).attrs.parent_id.history.has_changes():
+        _move_subtree(connection, target.id, target.parent_id)
+
+
+def _before_delete(mapper, connection, target) -> None:
+    connection.execute(delete(closure).where(
+        (closure.c.ancestor_id == target.id) | (closure.c.descendant_id == target.id)
+    ))
+
+
+def rebuild_category_closure() -> int:
+    """Recompute the whole closure table from ``Category.parent_id``; returns the row count."""
+    parents = dict(db.session.execute(select(Category.id, Category.parent_id)).all())
+    rows = []
+    for category_id in parents:
+        ancestor, depth, seen = category_id, 0, set()
+        while ancestor is not None and ancestor not in seen:
+            rows.append({"ancestor_id": ancestor, "descendant_id": category_id, "depth": depth})
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+    db.session.execute(delete(closure))
+    if rows:
+        db.session.execute(insert(closure), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def ensure_category_closure() -> None:
+    """Backfill the closure table for databases created before it existed."""
+    for index in Product.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    categories = db.session.execute(select(func.count(Category.id))).scalar()
+    self_links = db.session.execute(select(func.count()).select_from(closure).where(closure.c.depth == 0)).scalar()
+    if categories != self_links:
+        rebuild_category_closure()
+
+
+def filter_by_category_subtree(stmt, category_id: int):
+    """Restrict a statement selecting from Product to a category and its descendants."""
+    return stmt.join(CategoryClosure, CategoryClosure.descendant_id == Product.category_id).where(
+        CategoryClosure.ancestor_id == category_id
+    )
+
+
+def parse_category_arg(value: Optional[str]) -> Optional[int]:
+    """A ``category`` query argument as an id; missing, non-numeric or non-positive values mean no filter."""
+    try:
+        category_id = int(value) if value else None
+    except ValueError:
+        return None
+    return category_id if category_id is not None and category_id > 0 else None
+
+
+def breadcrumb_query(category_id: int):
+    return (
+        select(Category.id, Category.name)
+        .join(CategoryClosure, CategoryClosure.ancestor_id == Category.id)
+        .where(CategoryClosure.descendant_id == category_id)
+        .order_by(CategoryClosure.depth.desc())
+    )
+
+
+def category_breadcrumbs(category_id: int) -> List[Tuple[int, str]]:
+    """(id, name) pairs from the root down to ``category_id``, in one query."""
+    return [tuple(row) for row in db.session.execute(breadcrumb_query(category_id)).all()]
+
+
+def init_categories(app) -> None:
+    if not event.contains(Category, "after_insert", _after_insert):
+        event.listen(Category, "after_insert", _after_insert)
+        event.listen(Category, "after_update", _after_update)
+        event.listen(Category, "before_delete", _before_delete)
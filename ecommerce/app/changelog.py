@@ -0,0 +1,162 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Mapping, Optional, Tuple
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session, object_session
+from .extensions import db
+from .models import (
+    Product,
+    ProductChange,
+    PRODUCT_CHANGE_INSERT,
+    PRODUCT_CHANGE_UPDATE,
+    PRODUCT_CHANGE_DELETE,
+)
+
+
+TRACKED_FIELDS = ("title", "description", "price", "stock", "image_url", "is_active", "category_id", "vendor_id")
+
+# Woken after a commit that logged changes, so long-polls in this process return immediately
+_new_changes = threading.Condition()
+
+
+def record_product_change(connection, product_id: int, op: str, fields: Iterable[str] = (), vendor_id: Optional[int] = None,
+                          stock: Optional[int] = None, stock_delta: Optional[int] = None, price=None, is_active: Optional[bool] = None) -> None:
+    """Append a change row on ``connection``, i.e. inside the caller's transaction.
+
+    Use directly for bulk UPDATE/DELETE statements that bypass the ORM events.
+    """
+    connection.execute(insert(ProductChange.__table__).values(
+        product_id=product_id,
+        vendor_id=vendor_id,
+        op=op,
+        fields=",".join(fields) or None,
+        stock=stock,
+        stock_delta=stock_delta,
+        price=price,
+        is_active=is_active,
+        created_at=datetime.utcnow(),
+    ))
+
+
+def _log(connection, target: Product, op: str) -> None:
+    state = inspect(target)
+    if op == PRODUCT_CHANGE_UPDATE:
+        fields = [name for name in TRACKED_FIELDS if state.attrs[name].history.has_changes()]
+        if not fields:
+            return
+        stock_delta = None
+        if "stock" in fields:
+            previous = state.attrs.stock.history.deleted
+            stock_delta = target.stock - previous[0] if previous and previous[0] is not None else None
+    elif op == PRODUCT_CHANGE_INSERT:
+        fields = list(TRACKED_FIELDS)
+        stock_delta = target.stock
+    else:
+        fields = []
+        stock_delta = -target.stock if target.stock is not None else None
+    record_product_change(
+        connection,
+        target.id,
+        op,
+        fields,
+        vendor_id=target.vendor_id,
+        stock=target.stock,
+        stock_delta=stock_delta,
+        price=target.price,
+        is_active=target.is_active,
+    )
+    session = object_session(target)
+    if session is not None:
+        session.info["product_changes_logged"] = True
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _log(connection, target, PRODUCT_CHANGE_INSERT)
+
+
+def _after_update(mapper, connection, target) -> None:
+    _log(connection, target, PRODUCT_CHANGE_UPDATE)
+
+
+def _after_delete(mapper, connection, target) -> None:
+    _log(connection, target, PRODUCT_CHANGE_DELETE)
+
+
+def _after_commit(session) -> None:
+    if session.info.pop("product_changes_logged", False):
+        notify_new_changes()
+
+
+def _after_rollback(session) -> None:
+    session.info.pop("product_changes_logged", None)
+
+
+def notify_new_changes() -> None:
+    with _new_changes:
+        _new_changes.notify_all()
+
+
+def wait_for_changes(fetch: Callable[[], list], timeout: float, poll_interval: float = 1.0) -> list:
+    """Long-poll: call ``fetch`` until it returns rows or ``timeout`` seconds pass.
+
+    Commits in this process wake waiters at once; writes from other workers are
+    picked up by re-querying every ``poll_interval`` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        rows = fetch()
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return rows
+        # End the read transaction so the next query sees newly committed rows
+        db.session.rollback()
+        with _new_changes:
+            _new_changes.wait(min(poll_interval, remaining))
+
+
+def parse_change_query(args: Mapping[str, str], max_batch: int, max_wait: float) -> Tuple[int, int, float]:
+    """``after``, ``limit`` and ``wait`` from feed query args, clamped to the configured maxima.
+
+    Raises ValueError for values that are not (finite) numbers.
+    """
+    try:
+        after = int(args.get("after") or 0)
+        limit = int(args.get("limit") or 500)
+        wait = float(args.get("wait") or 0)
+    except ValueError:
+        raise ValueError("after, limit and wait must be numbers") from None
+    # nan survives min/max and would make the long-poll deadline unreachable
+    if not math.isfinite(wait):
+        raise ValueError("after, limit and wait must be numbers")
+    return after, min(max(limit, 1), max_batch), min(max(wait, 0), max_wait)
+
+
+def purge_product_changes(max_age: timedelta, batch_size: int = 5000) -> int:
+    """Delete feed rows older than ``max_age`` in short batches; returns the row count.
+
+    Consumers that fall further behind than this must resync from /api/products.
+    """
+    cutoff = datetime.utcnow() - max_age
+    # Oldest rows have the lowest ids, so the scan stops as soon as a batch is found
+    batch = select(ProductChange.id).where(ProductChange.created_at < cutoff).order_by(ProductChange.id).limit(batch_size)
+    rows = 0
+    while True:
+        deleted = db.session.execute(
+            delete(ProductChange).where(ProductChange.id.in_(batch.scalar_subquery())),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        db.session.commit()
+        if not deleted:
+            return rows
+        rows += deleted
+
+
+def init_changelog(app) -> None:
+    if not event.contains(Product, "after_insert", _after_insert):
+        event.listen(Product, "after_insert", _after_insert)
+        event.listen(Product, "after_update", _after_update)
+        event.listen(Product, "after_delete", _after_delete)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,83 @@
+import json
+import sys
+from datetime import timedelta
+import click
+from .extensions import db
+from .changelog import purge_product_changes
+from .exports import DEFAULT_CHUNK_SIZE, export_orders, iter_csv, iter_order_rows, parse_date_range
+from .jobs import enqueue, run_worker_pool, tasks
+from .maintenance import optimize_sqlite, purge_stale_carts
+
+
+def register_cli(app) -> None:
+    @app.cli.command("export-orders")
+    @click.option("--start", required=True, help="First day to include (YYYY-MM-DD).")
+    @click.option("--end", required=True, help="Last day to include (YYYY-MM-DD).")
+    @click.option("--format", "fmt", type=click.Choice(["csv", "columnar"]), default="csv", show_default=True,
+                  help="columnar writes Parquet when pyarrow is installed, the .ecol fallback otherwise.")
+    @click.option("--out", default="-", show_default=True, help="Output path without extension, or - for CSV on stdout.")
+    @click.option("--from-id", type=int, default=0, help="Resume at this order id (inclusive).")
+    @click.option("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, show_default=True)
+    def export_orders_command(start, end, fmt, out, from_id, chunk_size):
+        """Export orders and their items in a date range."""
+        start_at, end_at = parse_date_range(start, end)
+        if out == "-":
+            if fmt != "csv":
+                raise click.UsageError("Only CSV can be written to stdout; pass --out for columnar exports.")
+            for text in iter_csv(iter_order_rows(start_at, end_at, from_id, chunk_size)):
+                sys.stdout.write(text)
+            return
+
+        def progress(rows, last_order_id):
+            click.echo(f"\r{rows} rows, last order #{last_order_id}", nl=False, err=True)
+
+        path = export_orders(out, fmt, start_at, end_at, from_id, chunk_size, progress=progress)
+        click.echo(f"\nWrote {path}", err=True)
+
+
+    @app.cli.command("gc-carts")
+    @click.option("--max-age-days", type=float, default=None, help="Defaults to CART_SESSION_TTL_DAYS.")
+    @click.option("--batch-size", type=int, default=None, help="Sessions per delete batch; defaults to CART_GC_BATCH_SIZE.")
+    @click.option("--vacuum-pages", type=int, default=None, help="Pages to reclaim with incremental VACUUM.")
+    @click.option("--enable-incremental-vacuum", is_flag=True, help="Switch SQLite to auto_vacuum=INCREMENTAL (runs one full VACUUM).")
+    @click.option("--no-vacuum", is_flag=True, help="Only delete stale carts.")
+    def gc_carts_command(max_age_days, batch_size, vacuum_pages, enable_incremental_vacuum, no_vacuum):
+        """Delete expired anonymous carts and change-feed rows, then compact the database."""
+        max_age = timedelta(days=max_age_days if max_age_days is not None else app.config["CART_SESSION_TTL_DAYS"])
+        carts = purge_stale_carts(max_age, batch_size or app.config["CART_GC_BATCH_SIZE"])
+        click.echo(f"Deleted {carts['rows']} cart rows in {carts['batches']} batches ({carts['seconds']:.2f}s)")
+        changes = purge_product_changes(timedelta(days=app.config["CHANGES_KEEP_DAYS"]))
+        click.echo(f"Deleted {changes} product change rows older than {app.config['CHANGES_KEEP_DAYS']:g} days")
+        if no_vacuum:
+            return
+        report = optimize_sqlite(vacuum_pages or app.config["CART_GC_VACUUM_PAGES"], enable_incremental_vacuum)
+        click.echo(
+            f"VACUUM {report['vacuum']}, ANALYZE done: {report['pages_freed']} pages "
+            f"({report.get('bytes_freed', 0)} bytes) reclaimed in {report['seconds']:.2f}s"
+        )
+
+
+    @app.cli.command("worker")
+    @click.option("--processes", type=int, default=None, help="Worker processes; defaults to WORKER_PROCESSES.")
+    @click.option("--threads", type=int, default=None, help="Threads per process; defaults to WORKER_THREADS.")
+    @click.option("--poll-interval", type=float, default=None, help="Seconds to sleep when the queue is empty.")
+    @click.option("--burst", is_flag=True, help="Exit once no jobs are due (runs in a single process).")
+    def worker_command(processes, threads, poll_interval, burst):
+        """Run background jobs from the database queue."""
+        processes = processes or app.config["WORKER_PROCESSES"]
+        threads = threads or app.config["WORKER_THREADS"]
+        click.echo(f"Job worker: {processes} process(es) x {threads} thread(s); tasks: {', '.join(sorted(tasks))}", err=True)
+        run_worker_pool(app, processes, threads, poll_interval or app.config["WORKER_POLL_INTERVAL"], burst=burst)
+
+
+    @app.cli.command("enqueue")
+    @click.argument("name", type=click.Choice(sorted(tasks)))
+    @click.option("--payload", default="{}", help="Task keyword arguments as a JSON object.")
+    @click.option("--priority", type=int, default=0, show_default=True, help="Higher runs first.")
+    @click.option("--delay", type=float, default=0, help="Seconds to wait before the job is due.")
+    @click.option("--dedupe-key", default=None, help="Skip if a queued or running job has this key.")
+    def enqueue_command(name, payload, priority, delay, dedupe_key):
+        """Queue a background job."""
+        job = enqueue(name, json.loads(payload), priority=priority, delay=timedelta(seconds=delay), dedupe_key=dedupe_key)
+        db.session.commit()
+        click.echo(f"Queued job #{job.id}" if job is not None else "Ran inline (JOBS_EAGER)")
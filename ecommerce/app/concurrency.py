@@ -0,0 +1,125 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import delete, inspect, select, text, update
+from .extensions import db
+from .models import Product, CartItem, PRODUCT_CHANGE_UPDATE
+from .catalog import publish_catalog_change
+from .changelog import TRACKED_FIELDS, notify_new_changes, record_product_change
+
+
+VERSIONED_MODELS = (Product, CartItem)
+
+_sync = {"synchronize_session": False}
+
+
+class VersionConflict(Exception):
+    """The row exists and is owned by the caller, but was changed since ``version`` was read."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Row was modified concurrently (now at version {current_version})")
+        self.current_version = current_version
+
+
+def _resolve_miss(model, ident: int, owner) -> None:
+    # Only reached when the conditional write matched nothing: None means missing or not the caller's
+    current = db.session.execute(select(model.version).where(model.id == ident, owner)).scalar()
+    db.session.rollback()
+    if current is not None:
+        raise VersionConflict(current)
+
+
+def _differs(new, old) -> bool:
+    if isinstance(new, Decimal) or isinstance(old, Decimal):
+        return new is None or old is None or Decimal(new) != Decimal(old)
+    if isinstance(new, str) or isinstance(old, str):
+        # Empty form fields arrive as "" for columns stored as NULL
+        return (new or None) != (old or None)
+    return new != old
+
+
+def update_product(product_id: int, vendor_id: int, version: int, values: dict) -> Optional[int]:
+    """Write ``values`` to a vendor's product in one UPDATE and commit; returns the new version.
+
+    Returns None when the product does not exist or belongs to another vendor and
+    raises VersionConflict when ``version`` is stale. The change feed row and
+    catalog invalidation are done here because bulk UPDATEs skip the ORM events.
+    """
+    criteria = [Product.id == product_id, Product.vendor_id == vendor_id, Product.version == version]
+    # Every write bumps the version, so the row read here at ``version`` is the one
+    # the UPDATE below replaces (it matches nothing once another write commits);
+    # it gives the feed the fields that really change and the stock delta
+    before = db.session.execute(select(*(getattr(Product, name) for name in values)).where(*criteria)).first()
+    if before is None:
+        return _resolve_miss(Product, product_id, Product.vendor_id == vendor_id)
+    row = db.session.execute(
+        update(Product)
+        .where(*criteria)
+        .values(**values)
+        .returning(Product.version, Product.category_id, Product.stock, Product.price, Product.is_active),
+        execution_options=_sync,
+    ).first()
+    if row is None:
+        return _resolve_miss(Product, product_id, Product.vendor_id == vendor_id)
+    previous = before._mapping
+    fields = [name for name in TRACKED_FIELDS if name in values and _differs(values[name], previous[name])]
+    stock_delta = None
+    if "stock" in fields and previous["stock"] is not None:
+        stock_delta = row.stock - previous["stock"]
+    if fields:
+        record_product_change(
+            db.session.connection(),
+            product_id,
+            PRODUCT_CHANGE_UPDATE,
+            fields,
+            vendor_id=vendor_id,
+            stock=row.stock,
+            stock_delta=stock_delta,
+            price=row.price,
+            is_active=row.is_active,
+        )
+    db.session.commit()
+    notify_new_changes()
+    publish_catalog_change(
+        product_ids=[product_id],
+        vendor_ids=[vendor_id],
+        category_ids=[row.category_id] if row.category_id is not None else [],
+    )
+    return row.version
+
+
+def update_cart_item(item_id: int, owner, version: int, quantity: int) -> Optional[int]:
+    """Set a cart item's quantity in one UPDATE scoped by ``owner`` (a CartItem criterion) and commit.
+
+    Returns the new version, None when the item is missing or not the owner's,
+    and raises VersionConflict when ``version`` is stale.
+    """
+    criteria = [CartItem.id == item_id, owner, CartItem.version == version]
+    new_version = db.session.execute(
+        update(CartItem).where(*criteria).values(quantity=quantity, added_at=datetime.utcnow()).returning(CartItem.version),
+        execution_options=_sync,
+    ).scalar()
+    if new_version is None:
+        return _resolve_miss(CartItem, item_id, owner)
+    db.session.commit()
+    return new_version
+
+
+def delete_cart_item(item_id: int, owner, version: int) -> Optional[bool]:
+    """Delete a cart item in one statement scoped by ``owner``; same outcomes as ``update_cart_item``."""
+    criteria = [CartItem.id == item_id, owner, CartItem.version == version]
+    deleted = db.session.execute(delete(CartItem).where(*criteria), execution_options=_sync).rowcount
+    if not deleted:
+        return _resolve_miss(CartItem, item_id, owner)
+    db.session.commit()
+    return True
+
+
+def ensure_version_columns() -> None:
+    """Add the ``version`` column to tables created before it existed (create_all never alters tables)."""
+    inspector = inspect(db.engine)
+    for model in VERSIONED_MODELS:
+        table = model.__table__.name
+        if "version" not in {column["name"] for column in inspector.get_columns(table)}:
+            with db.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
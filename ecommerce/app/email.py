@@ -1,6 +1,7 @@
 from flask import current_app
 from flask_mail import Message
 from .extensions import mail
+from .jobs import task, enqueue, PRIORITY_HIGH
 
 
 def init_email(app):
@@ -8,6 +9,7 @@ def init_email(app):
     pass
 
 
+@task("send_email")
 def send_email(to: str, subject: str, body: str) -> None:
     if current_app.config.get("MAIL_SUPPRESS_SEND", True):
         print("--- Simulated Email ---")
@@ -17,4 +19,9 @@ def send_email(to: str, subject: str, body: str) -> None:
         print("-----------------------")
         return
     msg = Message(subject=subject, recipients=[to], body=body)
-    mail.send(msg)
\ No newline at end of file
+    mail.send(msg)
+
+
+def queue_email(to: str, subject: str, body: str) -> None:
+    """Send from a job worker; the email goes out only if the caller's transaction commits."""
+    enqueue("send_email", {"to": to, "subject": subject, "body": body}, priority=PRIORITY_HIGH)
@@ -0,0 +1,303 @@
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import uuid
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence
+from flask import current_app
+from sqlalchemy import select
+from .extensions import db
+from .jobs import task, enqueue, recent_jobs
+from .models import Job, User, Product, Order, OrderItem
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+
+# One row per order item (orders without items get a single row with empty item columns)
+EXPORT_COLUMNS = (
+    ("order_id", "int", Order.id),
+    ("created_at", "datetime", Order.created_at),
+    ("status", "str", Order.status),
+    ("user_id", "int", Order.user_id),
+    ("user_email", "str", User.email),
+    ("shipping_country", "str", Order.shipping_country),
+    ("total_amount", "money", Order.total_amount),
+    ("item_id", "int", OrderItem.id),
+    ("product_id", "int", OrderItem.product_id),
+    ("product_title", "str", Product.title),
+    ("quantity", "int", OrderItem.quantity),
+    ("unit_price", "money", OrderItem.unit_price),
+)
+COLUMN_NAMES = [name for name, _, _ in EXPORT_COLUMNS]
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_date_range(start: str, end: str):
+    """Turn inclusive ``YYYY-MM-DD`` dates into a half-open datetime range."""
+    start_at = datetime.strptime(start, "%Y-%m-%d")
+    end_at = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
+    return start_at, end_at
+
+
+def iter_order_rows(start_at: datetime, end_at: datetime, from_id: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Sequence[tuple]]:
+    """Yield export rows in chunks of ``chunk_size`` from a server-side cursor.
+
+    Rows are ordered by order id then item id. ``from_id`` restarts the export
+    at that order (inclusive), so an interrupted download resumes by dropping
+    the rows of the last order it received and asking again from that id.
+    """
+    stmt = (
+        select(*(column for _, _, column in EXPORT_COLUMNS))
+        .join(User, User.id == Order.user_id)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(Order.created_at >= start_at, Order.created_at < end_at, Order.id >= from_id)
+        .order_by(Order.id, OrderItem.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = db.session.execute(stmt)
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _csv_values(row: tuple) -> tuple:
+    return tuple(value.isoformat() if isinstance(value, datetime) else value for value in row)
+
+
+def iter_csv(chunks: Iterator[Sequence[tuple]], header: bool = True) -> Iterator[str]:
+    """Encode row chunks as CSV text, one string per chunk."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(COLUMN_NAMES)
+    for rows in chunks:
+        writer.writerows(_csv_values(row) for row in rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+class ParquetSink:
+    extension = "parquet"
+
+    def __init__(self, path: str):
+        self.path = path
+        money = pyarrow.decimal128(10, 2)
+        types = {"int": pyarrow.int64(), "datetime": pyarrow.timestamp("us"), "str": pyarrow.string(), "money": money}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind, _ in EXPORT_COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        columns = list(zip(*rows))
+        # Each chunk becomes one row group, so memory stays bounded by the chunk size
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class BinaryColumnarSink:
+    """Fallback columnar format used when pyarrow is not installed.
+
+    Layout: a ``ECOL1`` magic line, a JSON header line (column names, kinds,
+    byte order), then one block per chunk: a little-endian uint32 row count
+    followed by each column as a uint32 length plus zlib-compressed payload.
+    A column payload is a one-byte-per-row null mask then the values: int64
+    for ints, cents for money, epoch microseconds for datetimes, and int64
+    end offsets plus UTF-8 bytes for strings. See ``read_binary_columnar``.
+    """
+
+    extension = "ecol"
+    magic = b"ECOL1\n"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        header = {"columns": [[name, kind] for name, kind, _ in EXPORT_COLUMNS], "byteorder": sys.byteorder}
+        self.file.write(self.magic + json.dumps(header).encode() + b"\n")
+
+    @staticmethod
+    def _encode(kind: str, values) -> bytes:
+        mask = bytes(0 if value is None else 1 for value in values)
+        if kind == "str":
+            data = bytearray()
+            offsets = array("q")
+            for value in values:
+                data += (value or "").encode()
+                offsets.append(len(data))
+            return mask + offsets.tobytes() + bytes(data)
+        if kind == "money":
+            ints = (int(value * 100) if value is not None else 0 for value in values)
+        elif kind == "datetime":
+            epoch = datetime(1970, 1, 1)
+            ints = ((value - epoch) // timedelta(microseconds=1) if value is not None else 0 for value in values)
+        else:
+            ints = (value if value is not None else 0 for value in values)
+        return mask + array("q", ints).tobytes()
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        self.file.write(struct.pack("<I", len(rows)))
+        for (_, kind, _), values in zip(EXPORT_COLUMNS, zip(*rows)):
+            block = zlib.compress(self._encode(kind, values), 6)
+            self.file.write(struct.pack("<I", len(block)))
+            self.file.write(block)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def read_binary_columnar(path: str) -> Iterator[Dict[str, list]]:
+    """Read a file written by ``BinaryColumnarSink``, one dict of column lists per chunk."""
+    with open(path, "rb") as f:
+        if f.readline() != BinaryColumnarSink.magic:
+            raise ValueError(f"{path} is not an order export file")
+        header = json.loads(f.readline())
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("export was written on a machine with a different byte order")
+        epoch = datetime(1970, 1, 1)
+        while True:
+            raw = f.read(4)
+            if not raw:
+                return
+            (count,) = struct.unpack("<I", raw)
+            chunk = {}
+            for name, kind in header["columns"]:
+                (length,) = struct.unpack("<I", f.read(4))
+                payload = zlib.decompress(f.read(length))
+                mask, payload = payload[:count], payload[count:]
+                if kind == "str":
+                    offsets = array("q")
+                    offsets.frombytes(payload[:8 * count])
+                    data = payload[8 * count:]
+                    starts = [0] + list(offsets[:-1])
+                    values = [data[s:e].decode() for s, e in zip(starts, offsets)]
+                else:
+                    values = array("q")
+                    values.frombytes(payload)
+                    if kind == "money":
+                        values = [Decimal(v) / 100 for v in values]
+                    elif kind == "datetime":
+                        values = [epoch + timedelta(microseconds=v) for v in values]
+                chunk[name] = [value if present else None for value, present in zip(values, mask)]
+            yield chunk
+
+
+class CSVSink:
+    extension = "csv"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMN_NAMES)
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        self.writer.writerows(_csv_values(row) for row in rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def sink_class(fmt: str):
+    if fmt == "csv":
+        return CSVSink
+    if fmt == "columnar":
+        return ParquetSink if pyarrow is not None else BinaryColumnarSink
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_orders(path_without_extension: str, fmt: str, start_at: datetime, end_at: datetime, from_id: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> str:
+    """Write an export file and return its path; ``progress(rows, last_order_id)`` is called per chunk.
+
+    The file is written under a ``.part`` name and renamed once complete.
+    """
+    cls = sink_class(fmt)
+    path = f"{path_without_extension}.{cls.extension}"
+    sink = cls(path + ".part")
+    rows_written = 0
+    try:
+        for rows in iter_order_rows(start_at, end_at, from_id, chunk_size):
+            sink.write(rows)
+            rows_written += len(rows)
+            if progress:
+                progress(rows_written, rows[-1][0])
+    finally:
+        sink.close()
+    os.replace(sink.path, path)
+    return path
+
+
+def export_dir(app=None) -> str:
+    app = app or current_app
+    path = app.config.get("EXPORT_DIR") or os.path.join(app.instance_path, "exports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@task("export_orders")
+def export_orders_task(start: str, end: str, fmt: str, from_id: int = 0, name: str = "") -> dict:
+    start_at, end_at = parse_date_range(start, end)
+    summary = {"rows": 0, "last_order_id": None}
+
+    def progress(rows: int, last_order_id: int) -> None:
+        summary.update(rows=rows, last_order_id=last_order_id)
+
+    path = export_orders(os.path.join(export_dir(), name), fmt, start_at, end_at, from_id, progress=progress)
+    summary["file"] = os.path.basename(path)
+    return summary
+
+
+def start_export_job(start: str, end: str, fmt: str, from_id: int = 0) -> Optional[Job]:
+    """Queue an export for the job workers; committed by the caller."""
+    name = f"orders_{start}_{end}_from{from_id}_{uuid.uuid4().hex[:12]}"
+    return enqueue("export_orders", {"start": start, "end": end, "fmt": fmt, "from_id": from_id, "name": name})
+
+
+def export_job_rows(limit: int = 20) -> List[dict]:
+    """Recent export jobs flattened for display."""
+    rows = []
+    for job in recent_jobs("export_orders", limit):
+        params = json.loads(job.payload or "{}")
+        result = json.loads(job.result) if job.result else {}
+        rows.append({
+            "id": job.id,
+            "format": params.get("fmt"),
+            "start": params.get("start"),
+            "end": params.get("end"),
+            "from_id": params.get("from_id"),
+            "status": job.status,
+            "rows": result.get("rows"),
+            "last_order_id": result.get("last_order_id"),
+            "file": result.get("file"),
+            "error": job.last_error.strip().splitlines()[-1] if job.last_error else None,
+        })
+    return rows
+
+
+def list_export_files(app=None) -> List[dict]:
+    directory = export_dir(app)
+    files = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and not name.endswith(".part"):
+            files.append({"name": name, "size": os.path.getsize(path), "modified": datetime.fromtimestamp(os.path.getmtime(path))})
+    return files
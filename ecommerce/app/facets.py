@@ -0,0 +1,290 @@
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from threading import RLock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import select
+from .extensions import db
+from .models import Product, Vendor, Category
+from .catalog import CatalogChanges, catalog_feed, on_catalog_change
+
+
+# (key, lower bound inclusive, upper bound exclusive) in whole currency units
+PRICE_BUCKETS: Tuple[Tuple[str, int, Optional[int]], ...] = (
+    ("0-25", 0, 25),
+    ("25-50", 25, 50),
+    ("50-100", 50, 100),
+    ("100-250", 100, 250),
+    ("250-500", 250, 500),
+    ("500+", 500, None),
+)
+
+NO_CATEGORY = 0
+
+
+class FacetResult(NamedTuple):
+    product_ids: List[int]
+    total: int
+    categories: Dict[int, int]
+    vendors: Dict[int, int]
+    price_buckets: Dict[str, int]
+
+
+def _to_cents(value) -> int:
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+
+def _bucket_for(cents: int) -> str:
+    for key, low, high in PRICE_BUCKETS:
+        if cents >= low * 100 and (high is None or cents < high * 100):
+            return key
+    return PRICE_BUCKETS[0][0]
+
+
+def _mask_from_slots(slots: Iterable[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for slot in slots:
+        buf[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _slots_from_mask(mask: int) -> List[int]:
+    return [i for i, bit in enumerate(bin(mask)[:1:-1]) if bit == "1"]
+
+
+class FacetIndex:
+    """Columnar in-memory index of active products used for facet counts.
+
+    Each product occupies a slot in parallel arrays; every facet value keeps
+    a bitset (a Python int) of the slots it covers, so a count is an AND and a
+    popcount. Writes only mark products stale; they are reloaded in one query
+    the next time the index is read. Writes from other processes arrive through
+    the product change feed; category and vendor labels are reloaded every
+    ``ttl`` seconds since the feed does not cover them.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._lock = RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids = array("q")
+        self._vendors = array("q")
+        self._categories = array("q")
+        self._prices = array("q")
+        # (cents, slot) for live slots, sorted, so a price range is two bisections
+        self._by_price: List[Tuple[int, int]] = []
+        self._slot_of: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+        self._live = 0
+        self._by_vendor: Dict[int, int] = {}
+        self._by_category: Dict[int, int] = {}
+        self._by_bucket: Dict[str, int] = {key: 0 for key, _, _ in PRICE_BUCKETS}
+        self._children: Dict[int, List[int]] = {}
+        self._roots: List[int] = []
+        self._category_names: Dict[int, str] = {}
+        self._vendor_names: Dict[int, str] = {}
+        self._subtree_cache: Dict[int, int] = {}
+        self._stale_products: Set[int] = set()
+        self._stale_labels = True
+        self._labels_loaded_at = 0.0
+
+    def mark_stale(self, changes: CatalogChanges) -> None:
+        with self._lock:
+            self._stale_products |= changes.product_ids
+            if changes.vendor_ids or changes.category_ids:
+                self._stale_labels = True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+
+    def _product_rows(self, product_ids: Optional[Set[int]] = None):
+        stmt = select(Product.id, Product.vendor_id, Product.category_id, Product.price).where(Product.is_active.is_(True))
+        if product_ids is not None:
+            stmt = stmt.where(Product.id.in_(product_ids))
+        return db.session.execute(stmt).all()
+
+    def _load(self) -> None:
+        self._reset()
+        vendor_slots: Dict[int, List[int]] = {}
+        category_slots: Dict[int, List[int]] = {}
+        bucket_slots: Dict[str, List[int]] = {key: [] for key, _, _ in PRICE_BUCKETS}
+        for slot, (product_id, vendor_id, category_id, price) in enumerate(self._product_rows()):
+            cents = _to_cents(price)
+            self._ids.append(product_id)
+            self._vendors.append(vendor_id)
+            self._categories.append(category_id or NO_CATEGORY)
+            self._prices.append(cents)
+            self._slot_of[product_id] = slot
+            vendor_slots.setdefault(vendor_id, []).append(slot)
+            category_slots.setdefault(category_id or NO_CATEGORY, []).append(slot)
+            bucket_slots[_bucket_for(cents)].append(slot)
+            self._by_price.append((cents, slot))
+        self._by_price.sort()
+        size = len(self._ids)
+        self._live = _mask_from_slots(range(size), size)
+        self._by_vendor = {k: _mask_from_slots(v, size) for k, v in vendor_slots.items()}
+        self._by_category = {k: _mask_from_slots(v, size) for k, v in category_slots.items()}
+        self._by_bucket = {k: _mask_from_slots(v, size) for k, v in bucket_slots.items()}
+        self._load_labels()
+        self._loaded = True
+
+    def _load_labels(self) -> None:
+        self._children = {}
+        self._roots = []
+        self._category_names = {}
+        rows = db.session.execute(select(Category.id, Category.parent_id, Category.name).order_by(Category.name)).all()
+        for category_id, parent_id, name in rows:
+            self._category_names[category_id] = name
+            self._children.setdefault(category_id, [])
+            if parent_id is None:
+                self._roots.append(category_id)
+            else:
+                self._children.setdefault(parent_id, []).append(category_id)
+        self._vendor_names = dict(db.session.execute(select(Vendor.id, Vendor.name)).all())
+        self._subtree_cache = {}
+        self._stale_labels = False
+        self._labels_loaded_at = time.monotonic()
+
+    def _remove_slot(self, slot: int) -> None:
+        bit = 1 << slot
+        self._live &= ~bit
+        self._by_vendor[self._vendors[slot]] &= ~bit
+        self._by_category[self._categories[slot]] &= ~bit
+        self._by_bucket[_bucket_for(self._prices[slot])] &= ~bit
+        del self._by_price[bisect_left(self._by_price, (self._prices[slot], slot))]
+        del self._slot_of[self._ids[slot]]
+        self._free_slots.append(slot)
+
+    def _add_row(self, product_id: int, vendor_id: int, category_id: Optional[int], price) -> None:
+        cents = _to_cents(price)
+        category = category_id or NO_CATEGORY
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._ids[slot] = product_id
+            self._vendors[slot] = vendor_id
+            self._categories[slot] = category
+            self._prices[slot] = cents
+        else:
+            slot = len(self._ids)
+            self._ids.append(product_id)
+            self._vendors.append(vendor_id)
+            self._categories.append(category)
+            self._prices.append(cents)
+        bit = 1 << slot
+        self._slot_of[product_id] = slot
+        self._live |= bit
+        self._by_vendor[vendor_id] = self._by_vendor.get(vendor_id, 0) | bit
+        self._by_category[category] = self._by_category.get(category, 0) | bit
+        self._by_bucket[_bucket_for(cents)] |= bit
+        insort(self._by_price, (cents, slot))
+        # Subtree masks are derived from the category masks
+        self._subtree_cache = {}
+
+    def _refresh(self) -> None:
+        if not self._loaded:
+            self._load()
+            return
+        if self._stale_products:
+            stale, self._stale_products = self._stale_products, set()
+            for product_id in stale:
+                slot = self._slot_of.get(product_id)
+                if slot is not None:
+                    self._remove_slot(slot)
+            self._subtree_cache = {}
+            for row in self._product_rows(stale):
+                self._add_row(*row)
+        if self._stale_labels or time.monotonic() - self._labels_loaded_at > self.ttl:
+            self._load_labels()
+
+    def category_tree(self) -> List[Tuple[int, str, int]]:
+        """Categories as (id, name, depth), parents before their children."""
+        catalog_feed.poll()
+        with self._lock:
+            self._refresh()
+            ordered: List[Tuple[int, str, int]] = []
+            stack = [(cid, 0) for cid in reversed(self._roots)]
+            while stack:
+                category_id, depth = stack.pop()
+                ordered.append((category_id, self._category_names[category_id], depth))
+                stack.extend((child, depth + 1) for child in reversed(self._children.get(category_id, ())))
+            return ordered
+
+    def vendor_names(self) -> Dict[int, str]:
+        catalog_feed.poll()
+        with self._lock:
+            self._refresh()
+            return dict(self._vendor_names)
+
+    def _subtree(self, category_id: int) -> int:
+        mask = self._subtree_cache.get(category_id)
+        if mask is None:
+            mask = self._by_category.get(category_id, 0)
+            for child_id in self._children.get(category_id, ()):
+                mask |= self._subtree(child_id)
+            self._subtree_cache[category_id] = mask
+        return mask
+
+    def _price_range_mask(self, min_price, max_price) -> int:
+        start = bisect_left(self._by_price, (_to_cents(min_price), -1)) if min_price is not None else 0
+        end = bisect_right(self._by_price, (_to_cents(max_price), len(self._ids))) if max_price is not None else len(self._by_price)
+        return _mask_from_slots((slot for _, slot in self._by_price[start:end]), len(self._ids))
+
+    def search(
+        self,
+        category_id: Optional[int] = None,
+        vendor_id: Optional[int] = None,
+        price_bucket: Optional[str] = None,
+        min_price=None,
+        max_price=None,
+        keyword_ids: Optional[Iterable[int]] = None,
+    ) -> FacetResult:
+        """Return matching product ids and per-facet counts.
+
+        Counts for a facet are computed with every other active filter applied,
+        so they show how many results each refinement of that facet would give.
+        """
+        catalog_feed.poll()
+        with self._lock:
+            self._refresh()
+            base = self._live
+            if keyword_ids is not None:
+                base &= _mask_from_slots((self._slot_of[i] for i in keyword_ids if i in self._slot_of), len(self._ids))
+            if min_price is not None or max_price is not None:
+                base &= self._price_range_mask(min_price, max_price)
+
+            category_mask = self._subtree(category_id) if category_id else -1
+            vendor_mask = self._by_vendor.get(vendor_id, 0) if vendor_id else -1
+            bucket_mask = self._by_bucket.get(price_bucket, 0) if price_bucket else -1
+
+            without_category = base & vendor_mask & bucket_mask
+            without_vendor = base & category_mask & bucket_mask
+            without_bucket = base & category_mask & vendor_mask
+            selected = without_category & category_mask
+
+            categories = {
+                cid: (without_category & self._subtree(cid)).bit_count()
+                for cid in self._children
+            }
+            vendors = {
+                vid: (without_vendor & mask).bit_count()
+                for vid, mask in self._by_vendor.items()
+            }
+            buckets = {
+                key: (without_bucket & self._by_bucket[key]).bit_count()
+                for key, _, _ in PRICE_BUCKETS
+            }
+            product_ids = [self._ids[slot] for slot in _slots_from_mask(selected)]
+            return FacetResult(product_ids, len(product_ids), categories, vendors, buckets)
+
+
+facet_index = FacetIndex()
+
+
+def init_facets(app) -> None:
+    facet_index.ttl = app.config.get("CATALOG_CACHE_TTL", 300)
+    on_catalog_change(facet_index.mark_stale)
@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, BooleanField, TextAreaField, DecimalField, IntegerField, SelectField
+from wtforms import StringField, PasswordField, SubmitField, BooleanField, TextAreaField, DecimalField, IntegerField, SelectField, DateField
+from wtforms.widgets import HiddenInput
 from wtforms.validators import DataRequired, Email, EqualTo, Length, NumberRange, Optional
 
 
@@ -27,6 +28,8 @@ class ProductForm(FlaskForm):
     stock = IntegerField("Stock", validators=[DataRequired(), NumberRange(min=0)])
     image_url = StringField("Image URL", validators=[Optional(), Length(max=500)])
     category_id = SelectField("Category", coerce=int, validators=[Optional()])
+    # Version of the product the form was rendered from, checked on save
+    version = IntegerField(widget=HiddenInput(), validators=[Optional()])
     submit = SubmitField("Save")
 
 
@@ -58,4 +61,12 @@ class OrderStatusForm(FlaskForm):
         ("Delivered", "Delivered"),
         ("Cancelled", "Cancelled"),
     ], validators=[DataRequired()])
-    submit = SubmitField("Update Status")
\ No newline at end of file
+    submit = SubmitField("Update Status")
+
+
+class OrderExportForm(FlaskForm):
+    start = DateField("From", validators=[DataRequired()])
+    end = DateField("To", validators=[DataRequired()])
+    format = SelectField("Format", choices=[("csv", "CSV"), ("columnar", "Columnar (Parquet)")], validators=[DataRequired()])
+    from_id = IntegerField("Resume from order #", default=0, validators=[Optional(), NumberRange(min=0)])
+    submit = SubmitField("Start Export")
\ No newline at end of file
@@ -0,0 +1,380 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from flask import current_app
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .extensions import db
+from .models import Job, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_STATUSES
+
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+# Task name -> function; functions take the job payload as keyword arguments
+tasks: Dict[str, Callable] = {}
+
+# Task name -> seconds between runs; workers keep one future run of each queued
+periodic_tasks: Dict[str, float] = {}
+
+
+def task(name: str):
+    """Register a function as a job handler under ``name``."""
+    def decorator(func: Callable) -> Callable:
+        tasks[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name: str, payload: Optional[dict] = None, priority: int = PRIORITY_NORMAL, run_at: Optional[datetime] = None,
+            delay: Optional[timedelta] = None, dedupe_key: Optional[str] = None, max_attempts: Optional[int] = None) -> Optional[Job]:
+    """Add a job to the caller's session; it becomes visible to workers when the caller commits.
+
+    Higher ``priority`` runs first. With a ``dedupe_key`` the existing queued or
+    running job with that key is returned instead of adding another one. When
+    JOBS_EAGER is set the task runs in this process once the caller commits
+    (at the end of the request) and None is returned.
+    """
+    if name not in tasks:
+        raise KeyError(f"Unknown task: {name}")
+    payload = payload or {}
+    if current_app.config.get("JOBS_EAGER"):
+        db.session.info.setdefault("eager_jobs", []).append((name, payload))
+        return None
+    if dedupe_key is not None:
+        existing = _active_job(dedupe_key)
+        if existing is not None:
+            return existing
+    now = datetime.utcnow()
+    job = Job(
+        name=name,
+        payload=json.dumps(payload),
+        priority=priority,
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts or current_app.config.get("JOBS_MAX_ATTEMPTS", 3),
+        run_at=run_at or now + (delay or timedelta()),
+        created_at=now,
+    )
+    if dedupe_key is None:
+        db.session.add(job)
+        return job
+    # Another process may add the same key between the check and the insert;
+    # the partial unique index rejects the second row
+    try:
+        with _savepoint():
+            db.session.add(job)
+    except IntegrityError:
+        return _active_job(dedupe_key)
+    return job
+
+
+def _savepoint():
+    connection = db.session.connection()
+    # pysqlite defers BEGIN to the first INSERT/UPDATE, and a SAVEPOINT outside a
+    # transaction commits on release; open the caller's transaction first
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+    return db.session.begin_nested()
+
+
+def _active_job(dedupe_key: str) -> Optional[Job]:
+    return Job.query.filter(Job.dedupe_key == dedupe_key, Job.status.in_([JOB_QUEUED, JOB_RUNNING])).first()
+
+
+def _after_commit(session) -> None:
+    pending = session.info.pop("eager_jobs", None)
+    if pending:
+        session.info.setdefault("eager_jobs_ready", []).extend(pending)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop("eager_jobs", None)
+
+
+def run_eager_jobs(exc: Optional[BaseException] = None) -> None:
+    """Run JOBS_EAGER tasks whose transaction committed; called when the app context ends."""
+    ready = db.session.info.pop("eager_jobs_ready", None)
+    while ready:
+        name, payload = ready.pop(0)
+        try:
+            tasks[name](**payload)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Inline job %s failed", name)
+        # Tasks may queue follow-up jobs of their own
+        ready.extend(db.session.info.pop("eager_jobs_ready", ()))
+
+
+def schedule_periodic_tasks() -> None:
+    """Queue the next run of each periodic task that has none queued or running."""
+    for name, interval in periodic_tasks.items():
+        enqueue(name, delay=timedelta(seconds=interval), dedupe_key=f"periodic:{name}", priority=PRIORITY_LOW)
+    db.session.commit()
+
+
+def claim_next(worker_id: str) -> Optional[Job]:
+    """Atomically mark the next due job as running for ``worker_id``.
+
+    The claim is a conditional UPDATE on the job still being queued, so when two
+    workers pick the same row only one of them gets it; the other tries again.
+    """
+    while True:
+        now = datetime.utcnow()
+        job_id = db.session.execute(
+            select(Job.id)
+            .where(Job.status == JOB_QUEUED, Job.run_at <= now)
+            .order_by(Job.priority.desc(), Job.run_at, Job.id)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JOB_QUEUED)
+            .values(status=JOB_RUNNING, locked_by=worker_id, started_at=now, heartbeat_at=now, attempts=Job.attempts + 1),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+
+
+@contextmanager
+def _heartbeat(job_id: int, interval: float) -> Iterator[None]:
+    """Refresh the job's heartbeat_at every ``interval`` seconds while the block runs.
+
+    Uses its own connection so the task's transaction is left alone.
+    """
+    engine = db.engine
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(interval):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(update(Job).where(Job.id == job_id, Job.status == JOB_RUNNING).values(heartbeat_at=datetime.utcnow()))
+            except Exception:
+                # A missed beat only matters if it keeps failing for the whole timeout
+                pass
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job: Job) -> None:
+    """Run a claimed job and record the outcome; failures are retried with exponential backoff."""
+    job_id = job.id
+    try:
+        with _heartbeat(job_id, current_app.config.get("JOBS_TIMEOUT_SECONDS", 900) / 3):
+            result = tasks[job.name](**json.loads(job.payload or "{}"))
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = traceback.format_exc()[-4000:]
+        job.locked_by = None
+        if job.attempts < job.max_attempts:
+            backoff = current_app.config.get("JOBS_RETRY_BACKOFF", 10) * 2 ** (job.attempts - 1)
+            job.status = JOB_QUEUED
+            job.run_at = datetime.utcnow() + timedelta(seconds=backoff)
+        else:
+            job.status = JOB_FAILED
+            job.finished_at = datetime.utcnow()
+        current_app.logger.warning("Job %s (%s) failed on attempt %s", job_id, job.name, job.attempts)
+    else:
+        job = db.session.get(Job, job_id)
+        job.status = JOB_DONE
+        job.result = json.dumps(result) if result is not None else None
+        job.finished_at = datetime.utcnow()
+        job.locked_by = None
+    db.session.commit()
+
+
+def requeue_stale_jobs(timeout: timedelta) -> int:
+    """Return jobs left running by a worker that died to the queue (or fail them when out of attempts).
+
+    Running jobs refresh ``heartbeat_at`` while their task runs, so only jobs
+    whose worker stopped beating for ``timeout`` count as stale.
+    """
+    cutoff = datetime.utcnow() - timeout
+    stale = (Job.status == JOB_RUNNING, func.coalesce(Job.heartbeat_at, Job.started_at) < cutoff)
+    options = {"synchronize_session": False}
+    failed = db.session.execute(
+        update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status=JOB_FAILED, finished_at=datetime.utcnow(), locked_by=None, last_error="Timed out"),
+        execution_options=options,
+    ).rowcount
+    requeued = db.session.execute(
+        update(Job).where(*stale).values(status=JOB_QUEUED, locked_by=None, last_error="Timed out"),
+        execution_options=options,
+    ).rowcount
+    db.session.commit()
+    return failed + requeued
+
+
+def purge_finished_jobs(max_age: timedelta) -> int:
+    cutoff = datetime.utcnow() - max_age
+    deleted = Job.query.filter(Job.status.in_([JOB_DONE, JOB_FAILED]), Job.finished_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def work(app, threads: int = 1, poll_interval: float = 1.0, stop: Optional[threading.Event] = None, burst: bool = False) -> None:
+    """Process jobs with ``threads`` threads until ``stop`` is set.
+
+    With ``burst`` each thread exits as soon as the queue has nothing due.
+    """
+    stop = stop or threading.Event()
+    # Jobs queued by tasks go back to the queue instead of running inside this worker
+    app.config["JOBS_EAGER"] = False
+    housekeeping_every = app.config.get("JOBS_HOUSEKEEPING_SECONDS", 60)
+    last_housekeeping = [0.0]
+    lock = threading.Lock()
+
+    def housekeeping() -> None:
+        with lock:
+            if time.monotonic() - last_housekeeping[0] < housekeeping_every:
+                return
+            last_housekeeping[0] = time.monotonic()
+        requeue_stale_jobs(timedelta(seconds=app.config.get("JOBS_TIMEOUT_SECONDS", 900)))
+        purge_finished_jobs(timedelta(days=app.config.get("JOBS_KEEP_DAYS", 7)))
+        schedule_periodic_tasks()
+
+    def loop(n: int) -> None:
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{n}"
+        while not stop.is_set():
+            job = None
+            with app.app_context():
+                try:
+                    housekeeping()
+                    job = claim_next(worker_id)
+                    if job is not None:
+                        run_job(job)
+                except Exception:
+                    app.logger.exception("Job worker %s error", worker_id)
+                finally:
+                    db.session.remove()
+            if job is None:
+                if burst:
+                    return
+                stop.wait(poll_interval)
+
+    workers = [threading.Thread(target=loop, args=(n,), name=f"job-worker-{n}", daemon=True) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        # Let running jobs finish before exiting
+        stop.set()
+        for thread in workers:
+            thread.join()
+
+
+def _worker_process(threads: int, poll_interval: float) -> None:
+    from . import create_app
+
+    app = create_app()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    work(app, threads, poll_interval, stop)
+
+
+def _interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def run_worker_pool(app, processes: int = 1, threads: int = 1, poll_interval: float = 1.0, burst: bool = False) -> None:
+    """Run ``processes`` worker processes with ``threads`` threads each (one process runs in place).
+
+    SIGINT or SIGTERM stops taking new jobs and waits for running ones to finish.
+    """
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _interrupt)
+    if processes <= 1 or burst:
+        work(app, threads, poll_interval, burst=burst)
+        return
+    # spawn, not fork: each child builds its own app and database engine
+    ctx = multiprocessing.get_context("spawn")
+    children = [ctx.Process(target=_worker_process, args=(threads, poll_interval), name=f"job-worker-{n}") for n in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+
+
+def init_jobs(app) -> None:
+    app.teardown_appcontext(run_eager_jobs)
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
+
+def queue_stats(sample_size: int = 500) -> dict:
+    """Queue depth per task and status, plus wait/run latency over recently finished jobs."""
+    depth: Dict[str, Dict[str, int]] = {}
+    for name, status, count in db.session.execute(select(Job.name, Job.status, func.count()).group_by(Job.name, Job.status)):
+        depth.setdefault(name, dict.fromkeys(JOB_STATUSES, 0))[status] = count
+    now = datetime.utcnow()
+    due = db.session.execute(
+        select(func.count(), func.min(Job.run_at)).where(Job.status == JOB_QUEUED, Job.run_at <= now)
+    ).one()
+    recent = db.session.execute(
+        select(Job.name, Job.run_at, Job.started_at, Job.finished_at)
+        .where(Job.status == JOB_DONE, Job.started_at.is_not(None))
+        .order_by(Job.finished_at.desc())
+        .limit(sample_size)
+    ).all()
+    latency: Dict[str, Dict[str, List[float]]] = {}
+    for name, run_at, started_at, finished_at in recent:
+        entry = latency.setdefault(name, {"wait": [], "run": []})
+        entry["wait"].append(max(0.0, (started_at - run_at).total_seconds()))
+        entry["run"].append((finished_at - started_at).total_seconds())
+    return {
+        "depth": depth,
+        "due": due[0],
+        "oldest_due_seconds": (now - due[1]).total_seconds() if due[1] else 0.0,
+        "latency": {name: {kind: _summary(values) for kind, values in entry.items()} for name, entry in latency.items()},
+    }
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "avg": sum(ordered) / len(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def recent_jobs(name: Optional[str] = None, limit: int = 50) -> List[Job]:
+    query = Job.query
+    if name is not None:
+        query = query.filter(Job.name == name)
+    return query.order_by(Job.id.desc()).limit(limit).all()
@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from flask import current_app
+from sqlalchemy import delete, func, select, text
+from .changelog import purge_product_changes
+from .extensions import db
+from .jobs import periodic_tasks, task
+from .models import CartItem
+
+
+def purge_stale_carts(max_age: timedelta, batch_size: int = 500, max_batches: Optional[int] = None) -> Dict[str, float]:
+    """Delete anonymous carts whose newest item is older than ``max_age``.
+
+    Work is done in batches of at most ``batch_size`` sessions, each in its own
+    short transaction, so the cart table is never locked for long.
+    """
+    cutoff = datetime.utcnow() - max_age
+    stale_sessions = (
+        select(CartItem.session_id)
+        .where(CartItem.user_id.is_(None), CartItem.session_id.is_not(None))
+        .group_by(CartItem.session_id)
+        .having(func.max(CartItem.added_at) < cutoff)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    stmt = delete(CartItem).where(CartItem.user_id.is_(None), CartItem.session_id.in_(stale_sessions))
+
+    started = time.perf_counter()
+    rows = batches = 0
+    while max_batches is None or batches < max_batches:
+        deleted = db.session.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+        db.session.commit()
+        if not deleted:
+            break
+        rows += deleted
+        batches += 1
+    return {"rows": rows, "batches": batches, "seconds": time.perf_counter() - started}
+
+
+def optimize_sqlite(vacuum_pages: int = 1000, enable_incremental: bool = False) -> Dict[str, float]:
+    """Reclaim free pages with incremental VACUUM and refresh planner statistics.
+
+    Incremental vacuum only works once ``auto_vacuum=INCREMENTAL`` is set, which
+    needs one full VACUUM; that is done only when ``enable_incremental`` is true.
+    No-op on other databases.
+    """
+    report = {"pages_freed": 0, "seconds": 0.0, "vacuum": "skipped"}
+    if db.engine.dialect.name != "sqlite":
+        return report
+    started = time.perf_counter()
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        page_size = conn.execute(text("PRAGMA page_size")).scalar()
+        free_before = conn.execute(text("PRAGMA freelist_count")).scalar()
+        mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+        if mode != 2 and enable_incremental:
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+            report["vacuum"] = "full (enabled incremental)"
+        elif mode == 2:
+            conn.execute(text(f"PRAGMA incremental_vacuum({int(vacuum_pages)})"))
+            report["vacuum"] = "incremental"
+        conn.execute(text("ANALYZE"))
+        free_after = conn.execute(text("PRAGMA freelist_count")).scalar()
+    report["pages_freed"] = max(0, free_before - free_after)
+    report["bytes_freed"] = report["pages_freed"] * page_size
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def run_cart_gc(app) -> Dict[str, float]:
+    """One maintenance pass using the app's CART_* and CHANGES_KEEP_DAYS settings."""
+    carts = purge_stale_carts(
+        timedelta(days=app.config.get("CART_SESSION_TTL_DAYS", 30)),
+        app.config.get("CART_GC_BATCH_SIZE", 500),
+    )
+    report = {f"carts_{key}": value for key, value in carts.items()}
+    report["changes_rows"] = purge_product_changes(timedelta(days=app.config.get("CHANGES_KEEP_DAYS", 30)))
+    report.update({f"sqlite_{key}": value for key, value in optimize_sqlite(app.config.get("CART_GC_VACUUM_PAGES", 1000)).items()})
+    return report
+
+
+@task("gc_carts")
+def gc_carts_task() -> Dict[str, float]:
+    return run_cart_gc(current_app)
+
+
+def init_maintenance(app) -> None:
+    # Run by job workers rather than a thread in every process that creates the app
+    if app.config.get("CART_GC_INTERVAL_SECONDS", 0) > 0:
+        periodic_tasks["gc_carts"] = app.config["CART_GC_INTERVAL_SECONDS"]
@@ -78,10 +78,17 @@ class Category(db.Model):
     products = db.relationship("Product", back_populates="category")
 
 
+class CategoryClosure(db.Model):
+    # One row per (ancestor, descendant) pair, including each category with itself at depth 0
+    ancestor_id = db.Column(db.Integer, db.ForeignKey("category.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey("category.id", ondelete="CASCADE"), primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey("vendor.id"), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=True, index=True)
 
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -90,10 +97,16 @@ class Product(db.Model):
     image_url = db.Column(db.String(500), nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every UPDATE. ORM flushes check it through version_id_col and raise
+    # StaleDataError; bulk statements get the onupdate increment, and the ones in
+    # app/concurrency.py also check the version they were given
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1", onupdate=db.text("version + 1"))
 
     vendor = db.relationship("Vendor", back_populates="products")
     category = db.relationship("Category", back_populates="products")
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 class CartItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -102,9 +115,12 @@ class CartItem(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1", onupdate=db.text("version + 1"))
 
     product = db.relationship("Product")
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -139,4 +155,69 @@ class OrderItem(db.Model):
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
 
     order = db.relationship("Order", back_populates="items")
-    product = db.relationship("Product")
\ No newline at end of file
+    product = db.relationship("Product")
+
+
+PRODUCT_CHANGE_INSERT = "insert"
+PRODUCT_CHANGE_UPDATE = "update"
+PRODUCT_CHANGE_DELETE = "delete"
+
+
+class ProductChange(db.Model):
+    # AUTOINCREMENT keeps sequence numbers strictly increasing, even after deletes.
+    # Consumers resume from the last id they saw, which relies on ids becoming
+    # visible in id order: true on SQLite, where one writer commits at a time.
+    # A database with concurrent writers could commit id 11 before id 10 and a
+    # consumer past 11 would never see 10.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    vendor_id = db.Column(db.Integer, nullable=True)
+    op = db.Column(db.String(10), nullable=False)
+    fields = db.Column(db.String(255), nullable=True)
+    stock = db.Column(db.Integer, nullable=True)
+    stock_delta = db.Column(db.Integer, nullable=True)
+    price = db.Column(db.Numeric(10, 2), nullable=True)
+    is_active = db.Column(db.Boolean, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_STATUSES = [JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED]
+
+
+class Job(db.Model):
+    __table_args__ = (
+        # Workers claim by (status, run_at) ordered by priority
+        db.Index("ix_job_claim", "status", "run_at", "priority"),
+        # At most one queued or running job per deduplication key
+        db.Index(
+            "uq_job_active_dedupe_key",
+            "dedupe_key",
+            unique=True,
+            sqlite_where=db.text("status IN ('queued', 'running')"),
+            postgresql_where=db.text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=True)
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default=JOB_QUEUED)
+    dedupe_key = db.Column(db.String(200), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Refreshed by the worker while the task runs; stale jobs are requeued
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(120), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)
\ No newline at end of file
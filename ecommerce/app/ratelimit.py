@@ -0,0 +1,207 @@
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from flask import current_app, jsonify, request, session
+
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(spec: str) -> Tuple[float, float]:
+    """Parse "10/minute" (or "10 per minute") into (capacity, refill tokens per second)."""
+    count, _, period = spec.replace(" per ", "/").partition("/")
+    seconds = _PERIODS[period.strip().rstrip("s")]
+    capacity = float(count)
+    return capacity, capacity / seconds
+
+
+class MemoryStore:
+    """Token buckets kept in this process; fine for a single worker."""
+
+    # take() never waits on I/O, so async callers may call it inline
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # Buckets idle this long have refilled completely, so dropping them changes nothing
+        self.idle_seconds = 3600.0
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Consume one token; return 0 if allowed, otherwise seconds until one is available."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.idle_seconds
+        for key in [k for k, (_, updated) in self._buckets.items() if updated < cutoff]:
+            del self._buckets[key]
+
+
+class SQLiteStore:
+    """Token buckets in a small SQLite file shared by all workers on the host.
+
+    Every ``prune_every`` takes, buckets idle for ``idle_seconds`` are deleted so
+    the table does not keep a row for every client ever seen.
+    """
+
+    # take() can wait on the file lock (up to the busy timeout)
+    blocking = True
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self.prune_every = prune_every
+        self.idle_seconds = 3600.0
+        self._calls = itertools.count(1)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO rate_bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if next(self._calls) % self.prune_every == 0:
+            self.prune()
+        return wait
+
+    def prune(self, older_than: Optional[float] = None) -> int:
+        conn = self._connect()
+        cutoff = time.time() - (older_than if older_than is not None else self.idle_seconds)
+        cur = conn.execute("DELETE FROM rate_bucket WHERE updated < ?", (cutoff,))
+        return cur.rowcount
+
+
+def create_store(url: str):
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url in ("memory://", ""):
+        return MemoryStore()
+    raise ValueError(f"Unsupported RATELIMIT_STORAGE_URL: {url}")
+
+
+class RateLimiter:
+    def __init__(self, rules: Dict[str, dict], store):
+        self.store = store
+        self.rules = {}
+        for target, rule in rules.items():
+            self.rules[target] = {
+                "per_ip": parse_limit(rule["per_ip"]) if rule.get("per_ip") else None,
+                "per_user": parse_limit(rule["per_user"]) if rule.get("per_user") else None,
+                "per_account": parse_limit(rule["per_account"]) if rule.get("per_account") else None,
+                "methods": {m.upper() for m in rule.get("methods", ())},
+            }
+        # A bucket refills completely within capacity / rate seconds of its last use
+        refill = [60.0]
+        for rule in self.rules.values():
+            for limit in (rule["per_ip"], rule["per_user"], rule["per_account"]):
+                if limit:
+                    refill.append(limit[0] / limit[1])
+        store.idle_seconds = max(refill)
+
+    def rule_for(self, endpoint: Optional[str], method: str) -> Optional[Tuple[str, dict]]:
+        if not endpoint:
+            return None
+        # Endpoint rules win over blueprint rules
+        for target in (endpoint, endpoint.rpartition(".")[0]):
+            rule = self.rules.get(target)
+            if rule and (not rule["methods"] or method in rule["methods"]):
+                return target, rule
+        return None
+
+    def check(self, endpoint: Optional[str], method: str, ip: str, user_id: Optional[str]) -> float:
+        """Return 0 when the request is admitted, else the suggested Retry-After in seconds."""
+        match = self.rule_for(endpoint, method)
+        if match is None:
+            return 0.0
+        target, rule = match
+        now = time.time()
+        wait = 0.0
+        if rule["per_ip"]:
+            wait = max(wait, self.store.take(f"{target}:ip:{ip}", *rule["per_ip"], now))
+        if rule["per_user"] and user_id:
+            wait = max(wait, self.store.take(f"{target}:user:{user_id}", *rule["per_user"], now))
+        return wait
+
+    def record_failure(self, target: str, account: str) -> float:
+        """Charge a failed attempt against ``account`` (e.g. a login email) to ``target``'s per_account rule.
+
+        Called by the view only after the attempt failed, so the owner's own
+        successful logins are never refused because of other people's guesses.
+        Returns 0, or the Retry-After in seconds once the bucket is empty.
+        """
+        rule = self.rules.get(target)
+        account = account.strip().lower()
+        if not rule or not rule["per_account"] or not account:
+            return 0.0
+        return self.store.take(f"{target}:account:{account}", *rule["per_account"], time.time())
+
+
+def too_many_requests(wait: float):
+    if request.blueprint == "api":
+        response = jsonify({"error": "rate limit exceeded"})
+    else:
+        response = current_app.response_class("Too many requests, please slow down.", mimetype="text/plain")
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, int(wait + 0.999)))
+    return response
+
+
+def record_failed_attempt(target: str, account: str):
+    """Charge a failed attempt to the app's limiter; returns a 429 response once the account's bucket is empty, else None."""
+    limiter = current_app.extensions.get("ratelimit")
+    wait = limiter.record_failure(target, account) if limiter is not None else 0.0
+    return too_many_requests(wait) if wait else None
+
+
+def init_ratelimit(app) -> None:
+    """Register the admission check; must run before blueprints add their own hooks."""
+    if not app.config.get("RATELIMIT_ENABLED", True):
+        return
+    limiter = RateLimiter(app.config.get("RATELIMITS", {}), create_store(app.config.get("RATELIMIT_STORAGE_URL", "memory://")))
+    app.extensions["ratelimit"] = limiter
+
+    @app.before_request
+    def admit_request():
+        # Flask-Login keeps the user id in the signed session cookie, so no user lookup is needed
+        wait = limiter.check(request.endpoint, request.method, request.remote_addr or "-", session.get("_user_id"))
+        return too_many_requests(wait) if wait else None
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from flask import current_app
+from sqlalchemy import func
+from .extensions import db
+from .jobs import task, enqueue, PRIORITY_LOW
+from .models import Job, JOB_DONE, Vendor, Product, Order, OrderItem
+
+
+@task("build_reports")
+def build_reports() -> dict:
+    """Sales aggregates for the admin reports page, as JSON-serialisable lists."""
+    total_sales = db.session.query(func.coalesce(func.sum(Order.total_amount), 0)).scalar() or 0
+
+    sales_per_vendor = db.session.query(
+        Vendor.name,
+        func.coalesce(func.sum(OrderItem.unit_price * OrderItem.quantity), 0)
+    ).join(Product, Product.vendor_id == Vendor.id).join(OrderItem, OrderItem.product_id == Product.id).group_by(Vendor.id).all()
+
+    best_selling = db.session.query(
+        Product.title,
+        func.sum(OrderItem.quantity).label("qty")
+    ).join(OrderItem, OrderItem.product_id == Product.id).group_by(Product.id).order_by(func.sum(OrderItem.quantity).desc()).limit(10).all()
+
+    monthly = db.session.query(
+        func.strftime('%Y-%m', Order.created_at).label('month'),
+        func.coalesce(func.sum(Order.total_amount), 0)
+    ).group_by('month').order_by('month').all()
+
+    return {
+        "total_sales": float(total_sales),
+        "sales_per_vendor": [[name, float(sales)] for name, sales in sales_per_vendor],
+        "best_selling": [[title, int(qty)] for title, qty in best_selling],
+        "monthly": [[month, float(revenue)] for month, revenue in monthly],
+    }
+
+
+def report_snapshot(max_age: timedelta) -> Tuple[dict, Optional[datetime]]:
+    """The latest report built by a worker, queueing a rebuild once it is older than ``max_age``.
+
+    Only the very first request (before any worker has run) aggregates inline.
+    """
+    if current_app.config.get("JOBS_EAGER"):
+        return build_reports(), datetime.utcnow()
+    job = Job.query.filter_by(name="build_reports", status=JOB_DONE).order_by(Job.finished_at.desc()).first()
+    if job is None or job.finished_at < datetime.utcnow() - max_age:
+        enqueue("build_reports", dedupe_key="build_reports", priority=PRIORITY_LOW)
+        db.session.commit()
+    if job is None:
+        return build_reports(), datetime.utcnow()
+    return json.loads(job.result), job.finished_at
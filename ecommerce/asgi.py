@@ -0,0 +1,4 @@
+from app.api.aio import create_asgi_app
+
+# Read-only async JSON API; serve with e.g. `uvicorn asgi:app --port 8000`
+app = create_asgi_app()
@@ -0,0 +1 @@
+# Benchmark scripts; run from the ecommerce directory, e.g. `python -m benchmarks.api_concurrency`
@@ -0,0 +1,126 @@
+"""Compare the WSGI JSON API with the async read API (asgi.py) under concurrent clients.
+
+Starts both servers against a scratch database, then runs the same load
+against each:
+
+    python -m benchmarks.api_concurrency --concurrency 200 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from .common import add_products, bench_environment, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WSGI_SERVER = (
+    "import sys; from werkzeug.serving import run_simple; from run import app; "
+    "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def _session_cookie(user_email: str) -> str:
+    from flask.sessions import SecureCookieSessionInterface
+    from app import create_app
+    from app.models import User
+
+    app = create_app()
+    with app.app_context():
+        user = User.query.filter_by(email=user_email).first()
+        serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+        return serializer.dumps({"_user_id": str(user.id), "_fresh": True})
+
+
+async def _get(port: int, path: str, cookie: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: session={cookie}\r\nConnection: close\r\n\r\n"
+    writer.write(request.encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return int(data.split(b" ", 2)[1])
+
+
+async def _load(port: int, path: str, cookie: str, concurrency: int, total: int):
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = await _get(port, path, cookie)
+            except OSError:
+                status = 0
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500, help="extra products to seed")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    bench_environment()
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        add_products(args.products)
+    cookie = _session_cookie("customer@example.com")
+
+    wsgi_port, asgi_port = _free_port(), _free_port()
+    env = dict(os.environ)
+    servers = [
+        subprocess.Popen([sys.executable, "-c", WSGI_SERVER, str(wsgi_port)], cwd=ROOT, env=env, stderr=subprocess.DEVNULL),
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(asgi_port), "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        ),
+    ]
+    try:
+        _wait_for_port(wsgi_port)
+        _wait_for_port(asgi_port)
+        print(f"{'target':<28}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for path in ("/api/products", "/api/orders/me"):
+            for name, port in (("wsgi", wsgi_port), ("asgi", asgi_port)):
+                elapsed, latencies, errors = asyncio.run(_load(port, path, cookie, args.concurrency, args.requests))
+                print(
+                    f"{name + ' ' + path:<28}{args.requests / elapsed:>10.0f}"
+                    f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}{errors:>8}"
+                )
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Subtree product filters and breadcrumbs on a deep, wide category tree.
+
+Compares walking ``parent_id`` one query per level with a recursive CTE and
+with a single join on the category closure table:
+
+    python -m benchmarks.category_tree --depth 6 --fanout 5 --products 50000
+"""
+import argparse
+import random
+import time
+from .common import bench_environment
+
+
+def _timed(func, repeat: int):
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    bench_environment()
+    from sqlalchemy import func, insert, select
+    from app import create_app
+    from app.extensions import db
+    from app.models import Category, Product, Vendor
+    from app.categories import category_breadcrumbs, filter_by_category_subtree, rebuild_category_closure
+
+    app = create_app()
+    with app.app_context():
+        # Build the tree level by level with core inserts, then derive the closure in one pass
+        next_id = db.session.execute(select(func.max(Category.id))).scalar() + 1
+        levels, rows = [[]], []
+        for depth in range(args.depth):
+            parents = levels[-1] or [None]
+            level = []
+            for parent in parents:
+                for _ in range(args.fanout):
+                    rows.append({"id": next_id, "name": f"Tree {next_id}", "parent_id": parent})
+                    level.append(next_id)
+                    next_id += 1
+            levels.append(level)
+        db.session.execute(insert(Category), rows)
+        closure_rows = rebuild_category_closure()
+
+        rnd = random.Random(1)
+        all_ids = [r["id"] for r in rows]
+        vendor_id = db.session.execute(select(Vendor.id)).scalars().first()
+        db.session.execute(insert(Product), [
+            {"vendor_id": vendor_id, "category_id": rnd.choice(all_ids), "title": f"Tree product {i}", "price": 10, "stock": 1, "is_active": True}
+            for i in range(args.products)
+        ])
+        db.session.commit()
+        print(f"{len(rows)} categories, {closure_rows} closure rows, {args.products} products")
+
+        root, mid, leaf = levels[1][0], levels[len(levels) // 2][0], levels[-1][-1]
+
+        def walk_levels(category_id):
+            ids, frontier = [category_id], [category_id]
+            while frontier:
+                frontier = db.session.execute(select(Category.id).where(Category.parent_id.in_(frontier))).scalars().all()
+                ids.extend(frontier)
+            return db.session.execute(select(func.count(Product.id)).where(Product.category_id.in_(ids))).scalar()
+
+        def recursive_cte(category_id):
+            tree = select(Category.id).where(Category.id == category_id).cte("tree", recursive=True)
+            tree = tree.union_all(select(Category.id).where(Category.parent_id == tree.c.id))
+            return db.session.execute(select(func.count(Product.id)).where(Product.category_id.in_(select(tree.c.id)))).scalar()
+
+        def closure_join(category_id):
+            return db.session.execute(filter_by_category_subtree(select(func.count(Product.id)), category_id)).scalar()
+
+        def walk_parents(category_id):
+            crumbs = []
+            while category_id is not None:
+                row = db.session.execute(select(Category.id, Category.name, Category.parent_id).where(Category.id == category_id)).one()
+                crumbs.append((row.id, row.name))
+                category_id = row.parent_id
+            return crumbs[::-1]
+
+        print(f"{'case':<40}{'ms':>10}{'result':>10}")
+        for label, category_id in (("root subtree", root), ("mid subtree", mid), ("leaf subtree", leaf)):
+            for name, func_ in (("walk levels", walk_levels), ("recursive CTE", recursive_cte), ("closure join", closure_join)):
+                seconds, count = _timed(lambda: func_(category_id), args.repeat)
+                print(f"{label + ', ' + name:<40}{seconds * 1000:>10.2f}{count:>10}")
+        for name, func_ in (("parent walk", walk_parents), ("closure join", category_breadcrumbs)):
+            seconds, crumbs = _timed(lambda: func_(leaf), args.repeat)
+            print(f"{'leaf breadcrumbs, ' + name:<40}{seconds * 1000:>10.2f}{len(crumbs):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import random
+import tempfile
+
+
+def bench_environment(database_path: str = None) -> str:
+    """Point the app at a scratch SQLite database and disable rate limiting.
+
+    Must run before the app (and therefore ``config``) is imported.
+    """
+    if database_path is None:
+        database_path = os.path.join(tempfile.mkdtemp(prefix="ecommerce-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ["RATELIMIT_ENABLED"] = "false"
+    return database_path
+
+
+def add_products(count: int, vendors: int = 5, categories: int = 10, seed: int = 42) -> None:
+    """Insert ``count`` extra products spread over new vendors and categories (inside an app context)."""
+    from app.extensions import db
+    from app.models import User, Vendor, Category, Product, ROLE_VENDOR
+
+    rnd = random.Random(seed)
+    vendor_rows = []
+    for i in range(vendors):
+        user = User(email=f"bench-vendor-{i}@example.com", name=f"Bench Vendor {i}", role=ROLE_VENDOR, password_hash="-")
+        db.session.add(user)
+        db.session.flush()
+        vendor = Vendor(user_id=user.id, name=f"Bench Vendor {i}", approved=True)
+        db.session.add(vendor)
+        vendor_rows.append(vendor)
+    category_rows = [Category(name=f"Bench Category {i}") for i in range(categories)]
+    db.session.add_all(category_rows)
+    db.session.flush()
+    db.session.bulk_save_objects([
+        Product(
+            vendor_id=rnd.choice(vendor_rows).id,
+            category_id=rnd.choice(category_rows).id,
+            title=f"Bench product {i}",
+            description="Benchmark fixture",
+            price=round(rnd.uniform(1, 900), 2),
+            stock=rnd.randint(0, 500),
+            image_url=None,
+        )
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
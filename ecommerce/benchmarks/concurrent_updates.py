@@ -0,0 +1,138 @@
+"""Concurrent read-modify-write on a few hot products and cart items.
+
+Each thread repeatedly reads a row and writes back an incremented value:
+
+* ``naive``: load the ORM object, change it, commit (the version-checked flush
+  raises StaleDataError instead of overwriting a concurrent write)
+* ``optimistic``: one conditional UPDATE on the version read, retried on conflict
+
+Reports throughput, conflicts and lost updates (increments that vanished):
+
+    python -m benchmarks.concurrent_updates --threads 8 --ops 200 --hot 2
+"""
+import argparse
+import random
+import threading
+import time
+from .common import bench_environment, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="Successful increments per thread.")
+    parser.add_argument("--hot", type=int, default=2, help="Rows the threads contend on.")
+    parser.add_argument("--think-ms", type=float, default=1.0, help="Pause between the read and the write.")
+    args = parser.parse_args()
+
+    bench_environment()
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm.exc import StaleDataError
+    from app import create_app
+    from app.extensions import db
+    from app.models import CartItem, Product, User, ROLE_CUSTOMER
+    from app.concurrency import VersionConflict, update_cart_item, update_product
+    from .common import add_products
+
+    app = create_app()
+    with app.app_context():
+        add_products(args.hot, vendors=1, categories=1)
+        products = db.session.execute(select(Product.id, Product.vendor_id).order_by(Product.id.desc()).limit(args.hot)).all()
+        user_id = db.session.execute(select(User.id).where(User.role == ROLE_CUSTOMER)).scalar()
+        items = [CartItem(user_id=user_id, product_id=product_id, quantity=0) for product_id, _ in products]
+        db.session.add_all(items)
+        db.session.commit()
+        item_ids = [item.id for item in items]
+    owner = CartItem.user_id == user_id
+    think = args.think_ms / 1000
+
+    def naive_product(rnd):
+        product = db.session.get(Product, rnd.choice(products).id)
+        stock = product.stock
+        time.sleep(think)
+        product.stock = stock + 1
+        db.session.commit()
+
+    def optimistic_product(rnd):
+        product_id, vendor_id = rnd.choice(products)
+        stock, version = db.session.execute(select(Product.stock, Product.version).where(Product.id == product_id)).one()
+        db.session.rollback()
+        time.sleep(think)
+        update_product(product_id, vendor_id, version, {"stock": stock + 1})
+
+    def naive_cart(rnd):
+        item = db.session.get(CartItem, rnd.choice(item_ids))
+        quantity = item.quantity
+        time.sleep(think)
+        item.quantity = quantity + 1
+        db.session.commit()
+
+    def optimistic_cart(rnd):
+        item_id = rnd.choice(item_ids)
+        quantity, version = db.session.execute(select(CartItem.quantity, CartItem.version).where(CartItem.id == item_id)).one()
+        db.session.rollback()
+        time.sleep(think)
+        update_cart_item(item_id, owner, version, quantity + 1)
+
+    def totals():
+        with app.app_context():
+            stock = sum(db.session.execute(select(Product.stock).where(Product.id.in_([p.id for p in products]))).scalars())
+            quantity = sum(db.session.execute(select(CartItem.quantity).where(CartItem.id.in_(item_ids))).scalars())
+            return stock, quantity
+
+    def run(label, op, total_index):
+        before = totals()[total_index]
+        stats = {"conflicts": 0, "locked": 0}
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(n):
+            rnd = random.Random(n)
+            done = 0
+            while done < args.ops:
+                started = time.perf_counter()
+                with app.app_context():
+                    try:
+                        op(rnd)
+                    except (VersionConflict, StaleDataError):
+                        db.session.rollback()
+                        with lock:
+                            stats["conflicts"] += 1
+                        continue
+                    except OperationalError:
+                        # SQLite busy timeout; the write did not happen
+                        db.session.rollback()
+                        with lock:
+                            stats["locked"] += 1
+                        continue
+                    finally:
+                        db.session.remove()
+                done += 1
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        successes = len(latencies)
+        lost = before + successes - totals()[total_index]
+        print(
+            f"{label:<22}{successes / elapsed:>10.0f}{stats['conflicts']:>11}{stats['locked']:>8}{lost:>7}"
+            f"{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 95) * 1000:>9.2f}"
+        )
+
+    print(f"{args.threads} threads x {args.ops} increments on {args.hot} hot rows, {args.think_ms} ms think time")
+    print(f"{'case':<22}{'ops/s':>10}{'conflicts':>11}{'locked':>8}{'lost':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    run("product, naive", naive_product, 0)
+    run("product, optimistic", optimistic_product, 0)
+    run("cart item, naive", naive_cart, 1)
+    run("cart item, optimistic", optimistic_cart, 1)
+
+
+if __name__ == "__main__":
+    main()
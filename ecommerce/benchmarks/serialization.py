@@ -0,0 +1,71 @@
+"""Rows per second for the JSON API product listing: ORM + jsonify vs the schema serializer.
+
+    python -m benchmarks.serialization --products 20000
+"""
+import argparse
+import time
+from .common import add_products, bench_environment
+
+
+def _rate(func, rows: int, repeat: int) -> float:
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return rows * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_environment()
+    from flask import jsonify
+    from app import create_app
+    from app.extensions import db
+    from app.models import Product
+    from app.api import serializers
+    from app.api.serializers import dumps, encode_body, product_schema
+
+    app = create_app()
+    with app.app_context():
+        add_products(args.products)
+        rows = Product.query.filter_by(is_active=True).count()
+
+    def legacy():
+        products = Product.query.filter_by(is_active=True).all()
+        jsonify([
+            {"id": p.id, "title": p.title, "price": float(p.price), "stock": p.stock, "image_url": p.image_url}
+            for p in products
+        ]).get_data()
+        db.session.expunge_all()
+
+    def schema(fields=None, accept_encoding=""):
+        names = product_schema.field_names(fields)
+        result = db.session.execute(product_schema.select(names).where(Product.is_active.is_(True))).all()
+        encode_body(product_schema.dump_rows(result, names), accept_encoding, gzip_min_size=1024)
+
+    cases = [
+        ("orm + jsonify (previous)", legacy),
+        ("schema, all fields", schema),
+        ("schema, fields=id,price", lambda: schema("id,price")),
+        ("schema, all fields, gzip", lambda: schema(accept_encoding="gzip")),
+    ]
+    with app.test_request_context("/api/products"):
+        print(f"{rows} rows per request, JSON backend: {'orjson' if serializers.orjson else 'stdlib json'}")
+        print(f"{'path':<30}{'rows/s':>12}")
+        for label, func in cases:
+            print(f"{label:<30}{_rate(func, rows, args.repeat):>12.0f}")
+        if serializers.orjson is not None:
+            backend, serializers.orjson = serializers.orjson, None
+            print(f"{'schema, all fields, stdlib':<30}{_rate(schema, rows, args.repeat):>12.0f}")
+            serializers.orjson = backend
+        sample = product_schema.dump_rows(db.session.execute(product_schema.select(list(product_schema.fields))).all(), list(product_schema.fields))
+        compressed, _ = encode_body(sample, "gzip")
+        print(f"payload: {len(dumps(sample))} bytes, gzip {len(compressed)} bytes")
+
+
+if __name__ == "__main__":
+    main()
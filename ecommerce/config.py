@@ -6,6 +6,8 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///ecommerce.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Used by the async read API (asgi.py); derived from DATABASE_URL for SQLite when unset
+    ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL")
 
     # Flask-Login
     REMEMBER_COOKIE_DURATION = timedelta(days=14)
@@ -20,4 +22,55 @@ class Config:
     MAIL_SUPPRESS_SEND = os.environ.get("MAIL_SUPPRESS_SEND", "true").lower() == "true"
 
     # App
-    ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "admin@example.com")
\ No newline at end of file
+    ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "admin@example.com")
+
+    # Catalog
+    PRODUCT_CACHE_SIZE = int(os.environ.get("PRODUCT_CACHE_SIZE", 1024))
+    # Seconds between checks of the product change feed for writes made by other processes
+    # (0 checks on every read), and the longest any cached catalog data is kept
+    CATALOG_SYNC_INTERVAL = float(os.environ.get("CATALOG_SYNC_INTERVAL", 1.0))
+    CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", 300))
+
+    # Rate limiting: rules keyed by endpoint ("auth.login") or blueprint ("api").
+    # Use RATELIMIT_STORAGE_URL=sqlite:////path/ratelimit.db to share buckets between workers.
+    RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "true").lower() == "true"
+    RATELIMIT_STORAGE_URL = os.environ.get("RATELIMIT_STORAGE_URL", "memory://")
+    RATELIMITS = {
+        # per_account counts failed logins per submitted email (charged by the view), so one
+        # account can't be guessed at from many IPs; correct passwords are never refused by it
+        "auth.login": {"per_ip": "10/minute", "per_account": "20/hour", "methods": ["POST"]},
+        "cart.add_to_cart": {"per_ip": "60/minute", "per_user": "30/minute"},
+        "api": {"per_ip": "120/minute", "per_user": "120/minute"},
+    }
+
+    # JSON API responses at least this many bytes are gzipped for clients that accept it (-1 disables)
+    API_GZIP_MIN_SIZE = int(os.environ.get("API_GZIP_MIN_SIZE", 1024))
+
+    # /api/changes: largest batch per call and longest long-poll wait in seconds
+    CHANGES_MAX_BATCH = int(os.environ.get("CHANGES_MAX_BATCH", 1000))
+    CHANGES_MAX_WAIT = float(os.environ.get("CHANGES_MAX_WAIT", 25))
+    # Feed rows older than this are deleted by the maintenance pass (`flask gc-carts`)
+    CHANGES_KEEP_DAYS = float(os.environ.get("CHANGES_KEEP_DAYS", 30))
+
+    # Anonymous carts untouched for this long are deleted by `flask gc-carts`
+    # (or every CART_GC_INTERVAL_SECONDS by the job workers when > 0)
+    CART_SESSION_TTL_DAYS = float(os.environ.get("CART_SESSION_TTL_DAYS", 30))
+    CART_GC_BATCH_SIZE = int(os.environ.get("CART_GC_BATCH_SIZE", 500))
+    CART_GC_VACUUM_PAGES = int(os.environ.get("CART_GC_VACUUM_PAGES", 1000))
+    CART_GC_INTERVAL_SECONDS = int(os.environ.get("CART_GC_INTERVAL_SECONDS", 0))
+
+    # Background jobs (`flask worker`). JOBS_EAGER runs tasks inline after the request's commit instead
+    # of queueing; `python run.py` turns it on unless JOBS_EAGER=false.
+    JOBS_EAGER = os.environ.get("JOBS_EAGER", "false").lower() == "true"
+    JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 3))
+    # Retry n waits JOBS_RETRY_BACKOFF * 2**(n-1) seconds
+    JOBS_RETRY_BACKOFF = float(os.environ.get("JOBS_RETRY_BACKOFF", 10))
+    # Running jobs whose heartbeat is older than this are assumed abandoned by a dead worker and retried
+    JOBS_TIMEOUT_SECONDS = int(os.environ.get("JOBS_TIMEOUT_SECONDS", 900))
+    JOBS_KEEP_DAYS = float(os.environ.get("JOBS_KEEP_DAYS", 7))
+    WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", 1))
+    WORKER_THREADS = int(os.environ.get("WORKER_THREADS", 2))
+    WORKER_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", 1.0))
+
+    # Admin reports are rebuilt by a job once the cached copy is older than this
+    REPORTS_MAX_AGE_SECONDS = int(os.environ.get("REPORTS_MAX_AGE_SECONDS", 300))
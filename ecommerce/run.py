@@ -1,6 +1,9 @@
+import os
 from app import create_app
 
 app = create_app()
 
 if __name__ == "__main__":
+    # The development server usually runs without `flask worker`: run jobs inline unless told otherwise
+    app.config["JOBS_EAGER"] = os.environ.get("JOBS_EAGER", "true").lower() == "true"
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import pytest
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh seeded SQLite database, with an app context pushed."""
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(Config, "RATELIMIT_ENABLED", False)
+    from app import create_app
+    from app.catalog import catalog_feed, product_cache
+    from app.facets import facet_index
+
+    app = create_app()
+    # Module-level caches outlive the previous test's database
+    catalog_feed.last_seq = None
+    product_cache.clear()
+    facet_index.invalidate()
+    with app.app_context():
+        yield app
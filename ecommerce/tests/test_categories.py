@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import select
+from app.categories import closure, rebuild_category_closure
+from app.extensions import db
+from app.models import Category
+
+
+def _closure_rows():
+    return set(db.session.execute(select(closure.c.ancestor_id, closure.c.descendant_id, closure.c.depth)).all())
+
+
+def _assert_matches_rebuild():
+    incremental = _closure_rows()
+    rebuild_category_closure()
+    assert _closure_rows() == incremental
+
+
+@pytest.fixture
+def tree(app):
+    # a > b > c > d, and e > f
+    nodes = {}
+    for name, parent in [("a", None), ("b", "a"), ("c", "b"), ("d", "c"), ("e", None), ("f", "e")]:
+        nodes[name] = Category(name=f"test-{name}", parent=nodes.get(parent))
+        db.session.add(nodes[name])
+        db.session.commit()
+    _assert_matches_rebuild()
+    return nodes
+
+
+def test_move_subtree_under_another_parent(tree):
+    tree["b"].parent = tree["f"]
+    db.session.commit()
+    _assert_matches_rebuild()
+
+
+def test_move_subtree_to_root_and_back(tree):
+    tree["c"].parent = None
+    db.session.commit()
+    _assert_matches_rebuild()
+    tree["c"].parent = tree["e"]
+    db.session.commit()
+    _assert_matches_rebuild()
+
+
+def test_move_under_own_descendant_is_rejected(tree):
+    before = _closure_rows()
+    tree["b"].parent = tree["d"]
+    with pytest.raises(ValueError):
+        db.session.commit()
+    db.session.rollback()
+    assert _closure_rows() == before
+
+
+def test_delete_leaf(tree):
+    db.session.delete(tree["d"])
+    db.session.commit()
+    _assert_matches_rebuild()
+
+
+def test_delete_inner_category_detaches_children(tree):
+    db.session.delete(tree["b"])
+    db.session.commit()
+    assert tree["c"].parent_id is None
+    _assert_matches_rebuild()
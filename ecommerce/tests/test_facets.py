@@ -0,0 +1,105 @@
+import random
+from decimal import Decimal
+import pytest
+from sqlalchemy import select
+from app.extensions import db
+from app.facets import FacetIndex, _slots_from_mask, facet_index
+from app.models import Category, Product, Vendor
+from benchmarks.common import add_products
+
+
+def _snapshot(index: FacetIndex) -> dict:
+    """The index in slot-independent terms: product ids per facet value and the price order."""
+    def ids(mask):
+        return frozenset(index._ids[slot] for slot in _slots_from_mask(mask))
+
+    def grouped(masks):
+        return {key: ids(mask) for key, mask in masks.items() if mask}
+
+    live = ids(index._live)
+    assert set(index._slot_of) == live
+    assert all(index._ids[slot] == product_id for product_id, slot in index._slot_of.items())
+    return {
+        "live": live,
+        "vendors": grouped(index._by_vendor),
+        "categories": grouped(index._by_category),
+        "buckets": grouped(index._by_bucket),
+        "prices": sorted((cents, index._ids[slot]) for cents, slot in index._by_price),
+        "price_order": [cents for cents, _ in index._by_price] == sorted(cents for cents, _ in index._by_price),
+    }
+
+
+def _assert_matches_fresh_load():
+    # A search applies the pending incremental refresh
+    facet_index.search()
+    fresh = FacetIndex()
+    fresh._load()
+    assert _snapshot(facet_index) == _snapshot(fresh)
+    for min_price, max_price in [(None, 50), (10, 200), (199.99, 199.99), (500, None)]:
+        assert sorted(facet_index.search(min_price=min_price, max_price=max_price).product_ids) == sorted(
+            fresh.search(min_price=min_price, max_price=max_price).product_ids
+        )
+
+
+@pytest.fixture
+def products(app):
+    add_products(60, vendors=3, categories=4)
+    facet_index.search()
+    return db.session.execute(select(Product.id)).scalars().all()
+
+
+def test_incremental_writes_match_fresh_load(products):
+    rnd = random.Random(7)
+    vendor_ids = db.session.execute(select(Vendor.id)).scalars().all()
+    category_ids = db.session.execute(select(Category.id)).scalars().all()
+    for _ in range(5):
+        for product in Product.query.filter(Product.id.in_(rnd.sample(products, 15))):
+            change = rnd.choice(["price", "category", "vendor", "toggle"])
+            if change == "price":
+                product.price = Decimal(rnd.randint(100, 90000)) / 100
+            elif change == "category":
+                product.category_id = rnd.choice(category_ids + [None])
+            elif change == "vendor":
+                product.vendor_id = rnd.choice(vendor_ids)
+            else:
+                product.is_active = not product.is_active
+        db.session.commit()
+        _assert_matches_fresh_load()
+
+
+def test_freed_slots_are_reused_consistently(products):
+    # Deactivate, delete and add in separate rounds so freed slots get refilled
+    victims = Product.query.filter(Product.id.in_(products[:10])).all()
+    for product in victims[:5]:
+        product.is_active = False
+    for product in victims[5:]:
+        db.session.delete(product)
+    db.session.commit()
+    _assert_matches_fresh_load()
+    slots_before = len(facet_index._ids)
+
+    template = victims[0]
+    db.session.add_all([
+        Product(vendor_id=template.vendor_id, category_id=template.category_id, title=f"Refill {i}", price=Decimal(10 + i), stock=1)
+        for i in range(8)
+    ])
+    db.session.commit()
+    _assert_matches_fresh_load()
+    assert len(facet_index._ids) == slots_before
+
+    for product in victims[:5]:
+        product.is_active = True
+    db.session.commit()
+    _assert_matches_fresh_load()
+
+
+def test_same_product_changed_repeatedly_between_reads(products):
+    product = db.session.get(Product, products[0])
+    for price in ("5.00", "950.00", "42.42"):
+        product.price = Decimal(price)
+        db.session.commit()
+    product.is_active = False
+    db.session.commit()
+    product.is_active = True
+    db.session.commit()
+    _assert_matches_fresh_load()